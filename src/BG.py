@@ -6,6 +6,10 @@ from pathlib import Path
 import pygame
 import json
 import csv
+import parallax
+import editor_canvas
+import editor_store
+import editor_journal
 pygame.init()
 
 # File loading
@@ -181,42 +185,69 @@ for i, img in enumerate(img_list):
     tile_buttons.append(TileButton(img, x, y, button_size, i))
 
 selected_tile_index = None
-placed_tiles = []
+
+# Canvas chunks, shared scaled tiles and the grid overlay
+tile_images = editor_canvas.TileImages(img_list, TILE_SIZE)
+canvas = editor_canvas.EditorCanvas(tile_images, SCREEN_HEIGHT + LOWER_MARGIN)
+grid = editor_canvas.GridOverlay(TILE_SIZE, ROWS, SCREEN_WIDTH + SIDE_MARGIN, SCREEN_WIDTH, SCREEN_HEIGHT, WHITE)
+
+# Placed tiles, layered per cell without duplicates, with undo/redo
+# (Ctrl+Z / Ctrl+Y); every command is mirrored into the canvas as one batch
+# Every command is also journaled in the background (see editor_journal), so
+# a crash loses nothing and saving never stalls the editor
+journal = editor_journal.Journal(LEVEL_FILE)
+
+def on_tile_change(removed, added):
+    canvas.apply(removed, added)
+    journal.record(removed, added)
+
+placed_tiles = editor_store.TileStore(on_tile_change)
+
+recovered = editor_journal.recover(LEVEL_FILE)
+if recovered is not None:
+    placed_tiles.load(recovered)
+    tiles = placed_tiles.tiles()
+    canvas.set_tiles(tiles)
+    journal.reset(tiles, saved=False)
+    print(f"Recovered {len(placed_tiles)} tiles of unsaved work for {LEVEL_FILE.name}")
+
+# Region tools: Shift+drag fills (left) or erases (right) a rectangle,
+# Ctrl+drag selects one for Ctrl+C / Ctrl+X / Delete, Ctrl+V pastes at the
+# mouse and F flood-fills from the cell under it
+LEVEL_BOUNDS = (0, 0, MAX_COLS - 1, ROWS - 1)
+drag_start = None       # (cell, button, mode) while dragging a rectangle
+selection = None        # (x0, y0, x1, y1)
+clipboard = None
+
+def mouse_cell(pos):
+    return (min(pos[0], SCREEN_WIDTH - 1) + scroll) // TILE_SIZE, min(pos[1] // TILE_SIZE, ROWS - 1)
+
+def cell_rect(corners):
+    """Screen rect covering a (x0, y0, x1, y1) cell rectangle."""
+    x0, y0, x1, y1 = corners
+    left, top = min(x0, x1), min(y0, y1)
+    return pygame.Rect(left * TILE_SIZE - scroll, top * TILE_SIZE,
+                       (abs(x1 - x0) + 1) * TILE_SIZE, (abs(y1 - y0) + 1) * TILE_SIZE)
 
 load_button = Button(load_btn_img, SCREEN_WIDTH - 1000, SCREEN_HEIGHT - -30)
 save_button = Button(save_btn_img, SCREEN_WIDTH - 200, SCREEN_HEIGHT - -30)
 
 
+# The editor moves every layer one extra screen-scroll on top of its
+# parallax factor; only the repeats on screen are drawn
+background = parallax.ParallaxBackground([
+    parallax.ParallaxLayer(sky_img, 1.4, 0, sky_img.get_width(), repeats=17),
+    parallax.ParallaxLayer(mountain_img, 1.6, SCREEN_HEIGHT - mountain_img.get_height() - 260, sky_img.get_width(), repeats=17),
+    parallax.ParallaxLayer(pine1_img, 1.7, SCREEN_HEIGHT - pine1_img.get_height() - 100, sky_img.get_width(), repeats=17),
+    parallax.ParallaxLayer(pine2_img, 1.8, SCREEN_HEIGHT - pine2_img.get_height() + 20, sky_img.get_width(), repeats=17),
+])
+
 def draw_bg():
-    for i in range(17):
-        offset_x = (i * sky_img.get_width()) - scroll
-        screen.blit(sky_img, (offset_x - scroll * 0.4, 0))
-        screen.blit(
-            mountain_img,
-            (offset_x - scroll * 0.6, SCREEN_HEIGHT - mountain_img.get_height() - 260),
-        )
-        screen.blit(
-            pine1_img,
-            (offset_x - scroll * 0.7, SCREEN_HEIGHT - pine1_img.get_height() - 100),
-        )
-        screen.blit(
-            pine2_img,
-            (offset_x - scroll * 0.8, SCREEN_HEIGHT - pine2_img.get_height() + 20),
-        )
+    background.draw(screen, scroll)
 
 # Grid for accurate tile placement
 def draw_grid():
-    for c in range(MAX_COLS + 1):
-        pygame.draw.line(
-            screen,
-            WHITE,
-            (c * TILE_SIZE - scroll, 0),
-            (c * TILE_SIZE - scroll, SCREEN_HEIGHT),
-        )
-    for r in range(ROWS + 1):
-        pygame.draw.line(
-            screen, WHITE, (0, r * TILE_SIZE), (SCREEN_WIDTH, r * TILE_SIZE)
-        )
+    grid.draw(screen, scroll)
 
 run = True
 while run:
@@ -226,11 +257,12 @@ while run:
     draw_bg()
     draw_grid()
 
-    for tile_index, x, y, scale in placed_tiles:
-        tile_img = img_list[tile_index]
-        scaled_size = int(TILE_SIZE * scale)
-        scaled_img = pygame.transform.scale(tile_img, (scaled_size, scaled_size))
-        screen.blit(scaled_img, (x * TILE_SIZE - scroll, y * TILE_SIZE))
+    canvas.draw(screen, scroll, SCREEN_WIDTH + SIDE_MARGIN)
+
+    if drag_start is not None:
+        pygame.draw.rect(screen, WHITE, cell_rect(drag_start[0] + mouse_cell(pygame.mouse.get_pos())), 2)
+    elif selection is not None:
+        pygame.draw.rect(screen, (255, 220, 0), cell_rect(selection), 2)
 
     for button in tile_buttons:
         button.draw(screen)
@@ -242,9 +274,8 @@ while run:
     # Clicking button logic
     if selected_tile_index is not None:
         mouse_x, mouse_y = pygame.mouse.get_pos()
-        tile_img = img_list[selected_tile_index]
-        scaled_size = int(TILE_SIZE * tile_scale)
-        scaled_img = pygame.transform.scale(tile_img, (scaled_size, scaled_size))
+        scaled_size = tile_images.size(tile_scale)
+        scaled_img = tile_images.get(selected_tile_index, tile_scale)
 
         if mouse_x < SCREEN_WIDTH:
             snap_x = (mouse_x // TILE_SIZE) * TILE_SIZE
@@ -277,6 +308,27 @@ while run:
                 tile_scale = min(max_scale, tile_scale + scale_step)
             if event.key == pygame.K_MINUS:
                 tile_scale = max(min_scale, tile_scale - scale_step)
+            if event.mod & pygame.KMOD_CTRL:
+                if event.key == pygame.K_z and event.mod & pygame.KMOD_SHIFT or event.key == pygame.K_y:
+                    placed_tiles.redo()
+                elif event.key == pygame.K_z:
+                    placed_tiles.undo()
+                elif event.key in (pygame.K_c, pygame.K_x) and selection is not None:
+                    clipboard = placed_tiles.copy_rect(*selection)
+                    if event.key == pygame.K_x:
+                        placed_tiles.erase_rect(*selection)
+                elif event.key == pygame.K_v and clipboard:
+                    mouse_pos = pygame.mouse.get_pos()
+                    if mouse_pos[0] < SCREEN_WIDTH:
+                        placed_tiles.paste(clipboard, *mouse_cell(mouse_pos), LEVEL_BOUNDS)
+            elif event.key in (pygame.K_DELETE, pygame.K_BACKSPACE) and selection is not None:
+                placed_tiles.erase_rect(*selection)
+            elif event.key == pygame.K_ESCAPE:
+                selection = None
+            elif event.key == pygame.K_f and selected_tile_index is not None:
+                mouse_pos = pygame.mouse.get_pos()
+                if mouse_pos[0] < SCREEN_WIDTH:
+                    placed_tiles.flood_fill(*mouse_cell(mouse_pos), selected_tile_index, tile_scale, LEVEL_BOUNDS)
 
         if event.type == pygame.KEYUP:
             if event.key == pygame.K_LEFT:
@@ -286,6 +338,14 @@ while run:
 
         if event.type == pygame.MOUSEBUTTONDOWN:
             mouse_pos = pygame.mouse.get_pos()
+            mods = pygame.key.get_mods()
+
+            # --- Start a rectangle ---
+            if event.button in (1, 3) and mouse_pos[0] < SCREEN_WIDTH and mods & (pygame.KMOD_SHIFT | pygame.KMOD_CTRL):
+                mode = "select" if mods & pygame.KMOD_CTRL else "fill" if event.button == 1 else "erase"
+                if mode != "fill" or selected_tile_index is not None:
+                    drag_start = (mouse_cell(mouse_pos), event.button, mode)
+                continue
 
             if event.button == 1:
                 for button in tile_buttons:
@@ -295,24 +355,12 @@ while run:
                 if selected_tile_index is not None and mouse_pos[0] < SCREEN_WIDTH:
                     grid_x = (mouse_pos[0] + scroll) // TILE_SIZE
                     grid_y = mouse_pos[1] // TILE_SIZE
-                    placed_tiles.append(
-                        (selected_tile_index, grid_x, grid_y, tile_scale)
-                    )
+                    placed_tiles.place(selected_tile_index, grid_x, grid_y, tile_scale)
 
                 # --- Save ---
                 if save_button.is_clicked(mouse_pos):
-                    # Save as a list of dicts for clarity
-                    save_data = [
-                        {
-                            "tile_index": tile_index,
-                            "x": x,
-                            "y": y,
-                            "scale": scale
-                        }
-                        for tile_index, x, y, scale in placed_tiles
-                    ]
-                    with open(LEVEL_FILE, "w") as f:
-                        json.dump(save_data, f, indent=4)  # indent makes it easier to edit manually
+                    # Written as a list of dicts on the journal thread
+                    journal.save()
                     #print(f"Saved {len(placed_tiles)} tiles to {LEVEL_FILE}")
 
                 # --- Load ---
@@ -323,24 +371,15 @@ while run:
                             loaded_tiles = json.load(f)
                         #print(f"Raw loaded data: {loaded_tiles}")
 
-                        placed_tiles.clear()
-
-                        for item in loaded_tiles:
-                            # Handle dict format
-                            if isinstance(item, dict):
-                                tile_index = item.get("tile_index", 0)
-                                x = item.get("x", 0)
-                                y = item.get("y", 0)
-                                scale = item.get("scale", 1.0)
-                                placed_tiles.append((tile_index, x, y, scale))
-                            # Handle old list format: [tile_index, x, y, scale] or [x, y, tile_index]
-                            elif isinstance(item, list):
-                                if len(item) == 4:
-                                    tile_index, x, y, scale = item
-                                    placed_tiles.append((tile_index, x, y, scale))
-                                elif len(item) == 3:
-                                    x, y, tile_index = item
-                                    placed_tiles.append((tile_index, x, y, 1.0))
+                        read = placed_tiles.load(loaded_tiles)
+                        tiles = placed_tiles.tiles()
+                        canvas.set_tiles(tiles)
+                        # merged duplicates (or unreadable entries) mean the
+                        # editor no longer matches the file: keep it as unsaved work
+                        unchanged = read == len(tiles) == len(loaded_tiles)
+                        journal.reset(tiles, saved=unchanged)
+                        if not unchanged:
+                            print(f"Merged {len(loaded_tiles) - len(tiles)} duplicate tiles; save to write the cleaned level")
                        # print(f"Loaded {len(placed_tiles)} tiles successfully")
                     else:
                         print("No level.json file found!")
@@ -349,12 +388,21 @@ while run:
             if event.button == 3 and mouse_pos[0] < SCREEN_WIDTH:
                 grid_x = (mouse_pos[0] + scroll) // TILE_SIZE
                 grid_y = mouse_pos[1] // TILE_SIZE
-                placed_tiles = [
-                    (t_index, x, y, s)
-                    for t_index, x, y, s in placed_tiles
-                    if not (x == grid_x and y == grid_y)
-                ]
+                placed_tiles.erase(grid_x, grid_y)
+
+        # --- Finish a rectangle ---
+        if event.type == pygame.MOUSEBUTTONUP and drag_start is not None and event.button == drag_start[1]:
+            start, _, mode = drag_start
+            corners = start + mouse_cell(pygame.mouse.get_pos())
+            if mode == "fill":
+                placed_tiles.fill_rect(*corners, selected_tile_index, tile_scale)
+            elif mode == "erase":
+                placed_tiles.erase_rect(*corners)
+            else:
+                selection = corners
+            drag_start = None
 
     pygame.display.update()
 
+journal.close()
 pygame.quit()
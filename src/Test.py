@@ -3,8 +3,23 @@ import sys
 import pygame
 import os
 import random
+import time
+import heapq
+from array import array
+from collections import OrderedDict
 from pathlib import Path
 import json
+import level_format
+import text_cache
+import animation
+import atlas
+import asset_loader
+import parallax
+import perf_hud
+import tracing
+import zlib
+import base64
+import struct
 
 # ----------------------------
 # MUSIC
@@ -38,7 +53,7 @@ SFX_PATHS = {
 def load_sfx(path):
     try:
         if path.exists():
-            snd = pygame.mixer.Sound(str(path))
+            snd = asset_loader.sound(path)
             snd.set_volume(0.9)
             return snd
         else:
@@ -55,13 +70,21 @@ SCREEN_HEIGHT = 740
 LOWER_MARGIN = 0
 SIDE_MARGIN = 300
 FPS = 60
+# Physics runs in fixed steps, independent of the render rate. Speeds and
+# gravity are tuned per 60 Hz step and scaled by STEP_SCALE; positions still
+# snap to whole pixels each step, so only use rates at or below 60 (30, 20).
+PHYSICS_HZ = 60
+PHYSICS_STEP_MS = 1000 / PHYSICS_HZ
+STEP_SCALE = 60 / PHYSICS_HZ
+MAX_FRAME_MS = 250              # clamp long frames so physics can catch up
+LOAD_BUDGET_MS = 8              # level loading work per frame behind the loading screen
 ROWS = 16
 TILE_SIZE = SCREEN_HEIGHT // ROWS
 WOLF_GROUND_ROW   = 14          
 WOLF_PIXEL_ADJUST = 0           
 
-# Maximum scroll (end of level)
-MAX_SCROLL = 11500
+# Character sprites are drawn at this multiple of their source pixels
+PLAYER_SCALE = 2.0
 
 # Paths
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -75,6 +98,12 @@ BG_ASSETS = ASSETS / "Background"
 WHITE = (255, 255, 255)
 GAME_BG = (30, 30, 30)
 
+# Headless runs (build boxes, benchmarks) use SDL's dummy drivers
+HEADLESS = os.environ.get("RUN_RED_HEADLESS") == "1"
+if HEADLESS:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
 # ----------------------------
 # INIT
 # ----------------------------
@@ -87,6 +116,13 @@ screen = pygame.display.set_mode((SCREEN_WIDTH + SIDE_MARGIN, SCREEN_HEIGHT + LO
 pygame.display.set_caption("Run Red, Run!")
 clock = pygame.time.Clock()
 
+# Decode every sound and image on worker threads; the loads below collect
+# the results (and convert them for the display) on this thread.
+tile_files = sorted(TILE_ASSETS.glob("*.png"))
+asset_loader.prefetch(SFX_PATHS.values(), "sound")
+asset_loader.prefetch([BG_ASSETS / f"{name}.png" for name in ("sky_cloud", "mountain", "pine1", "pine2")] + tile_files)
+asset_loader.prefetch([atlas.image_path(atlas.ATLAS_ROOT / f"{name}.json") for name in ("red", "wolf")], scale=PLAYER_SCALE)
+
 # Load SFX AFTER mixer init
 sfx = {name: load_sfx(p) for name, p in SFX_PATHS.items()}
 print("Loaded SFX:", [name for name, snd in sfx.items() if snd])
@@ -94,11 +130,11 @@ print("Loaded SFX:", [name for name, snd in sfx.items() if snd])
 # ----------------------------
 # LOAD BACKGROUND
 # ----------------------------
-def load_image_safe(path):
+def load_image_safe(path, scale=1.0):
     try:
-        return pygame.image.load(str(path)).convert_alpha()
+        return asset_loader.image(path, scale)
     except:
-        surf = pygame.Surface((64,64))
+        surf = pygame.Surface((int(64*scale), int(64*scale)))
         surf.fill((255,0,255))
         return surf
 
@@ -107,11 +143,23 @@ mountain_img = load_image_safe(BG_ASSETS / "mountain.png")
 pine1_img = load_image_safe(BG_ASSETS / "pine1.png")
 pine2_img = load_image_safe(BG_ASSETS / "pine2.png")
 
+# Layers repeat every sky width; only the repeats on screen are drawn
+BG_STRIPS = False
+BG_SPACING = sky_img.get_width()
+background = parallax.ParallaxBackground([
+    parallax.ParallaxLayer(sky_img, 0.4, 0, BG_SPACING),
+    parallax.ParallaxLayer(mountain_img, 0.6, SCREEN_HEIGHT - mountain_img.get_height() - 260, BG_SPACING),
+    parallax.ParallaxLayer(pine1_img, 0.7, SCREEN_HEIGHT - pine1_img.get_height() - 100, BG_SPACING),
+    parallax.ParallaxLayer(pine2_img, 0.8, SCREEN_HEIGHT - pine2_img.get_height() + 20, BG_SPACING),
+], strips=BG_STRIPS)
+
+def draw_background(surf, scroll):
+    background.draw(surf, scroll)
+
 # ----------------------------
 # LOAD TILES
 # ----------------------------
 img_list = []
-tile_files = sorted(TILE_ASSETS.glob("*.png"))
 if not tile_files:
     raise FileNotFoundError(f"No tile images found in {TILE_ASSETS}")
 for tile_path in tile_files:
@@ -123,122 +171,557 @@ for tile_path in tile_files:
 def load_frames(paths, scale=1.0):
     frames = []
     for p in paths:
-        img = load_image_safe(p)
-        if scale != 1.0:
-            img = pygame.transform.scale(img, (int(img.get_width()*scale), int(img.get_height()*scale)))
-        frames.append(img)
+        frames.append(load_image_safe(p, scale))
     return frames
-PLAYER_SCALE = 2.0
+
+
+# Packed sheets from atlas.py; missing atlases fall back to the frame PNGs
+RED_ATLAS = atlas.load(atlas.ATLAS_ROOT / "red.json", PLAYER_SCALE)
+WOLF_ATLAS = atlas.load(atlas.ATLAS_ROOT / "wolf.json", PLAYER_SCALE)
+
+def atlas_frames(sheet, name, paths):
+    return animation.store.add(name, atlas.frames_or(sheet, name, lambda: load_frames(paths, PLAYER_SCALE)))
 
 
 # ----------------------------
 # LOAD WOLF FRAMES
 # ----------------------------
-WOLF_STAND_FRAMES = load_frames([ASSETS_ROOT / f"wolf_stand_{i}.png" for i in range(1,8)], PLAYER_SCALE)
-WOLF_IDLE_FRAMES = load_frames([ASSETS_ROOT / f"wolf_idle_{i}.png" for i in range(1, 8)], PLAYER_SCALE)
+WOLF_STAND_FRAMES = atlas_frames(WOLF_ATLAS, "wolf_stand", [ASSETS_ROOT / f"wolf_stand_{i}.png" for i in range(1,8)])
+WOLF_IDLE_FRAMES = atlas_frames(WOLF_ATLAS, "wolf_idle", [ASSETS_ROOT / f"wolf_idle_{i}.png" for i in range(1, 8)])
 
-PLAYER_SCALE = 2.0
+PLAYER_IDLE_FRAMES = atlas_frames(RED_ATLAS, "red_idle", [ASSETS_ROOT / f"red_idle_{i}.png" for i in range(1,9)])
+PLAYER_RUN         = atlas_frames(RED_ATLAS, "red_run", [ASSETS_ROOT / f"red_run_{i}.png"  for i in range(1,24)])
+PLAYER_CLIMB       = atlas_frames(RED_ATLAS, "red_climb", [ASSETS_ROOT / f"red_wallslide_{i}.png" for i in range(1,5)])
+PLAYER_JUMP        = atlas_frames(RED_ATLAS, "red_jump", [ASSETS_ROOT / f"red_jump_{i}.png" for i in range(1,13)])
+PLAYER_TURN        = atlas_frames(RED_ATLAS, "red_turn", [ASSETS_ROOT / f"red_turn_{i}.png" for i in range(1,3)])
 
-PLAYER_IDLE_FRAMES = load_frames([ASSETS_ROOT / f"red_idle_{i}.png" for i in range(1,9)], PLAYER_SCALE)
-PLAYER_RUN         = load_frames([ASSETS_ROOT / f"red_run_{i}.png"  for i in range(1,24)], PLAYER_SCALE)
-PLAYER_CLIMB       = load_frames([ASSETS_ROOT / f"red_wallslide_{i}.png" for i in range(1,5)], PLAYER_SCALE)
-PLAYER_JUMP        = load_frames([ASSETS_ROOT / f"red_jump_{i}.png" for i in range(1,13)], PLAYER_SCALE)
-PLAYER_TURN        = load_frames([ASSETS_ROOT / f"red_turn_{i}.png" for i in range(1,3)], PLAYER_SCALE)
 
 
+# ----------------------------
+# SCALED TILE CACHE
+# ----------------------------
+TILE_CACHE_BUDGET = 64 * 1024 * 1024   # bytes of scaled tile pixels
+
+class ScaledTileCache:
+    """Scaled tile surfaces keyed by (tile_index, pixel_w, pixel_h).
+
+    Placements that round to the same pixel size share one surface, and the
+    cache outlives a World so reloading a level reuses it. Least recently
+    used entries are dropped once the pixel bytes exceed `budget`; surfaces
+    already handed to a world stay alive there.
+    """
+    def __init__(self, budget=TILE_CACHE_BUDGET):
+        self.budget = budget
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tile_index, size):
+        key = (tile_index, size[0], size[1])
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = pygame.transform.scale(img_list[tile_index], size)
+        self.surfaces[key] = surf
+        self.bytes += size[0] * size[1] * surf.get_bytesize()
+        while self.bytes > self.budget and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+        return surf
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+tile_cache = ScaledTileCache()
+
 
 # ----------------------------
-# PARTICLE EFFECTS
+# SIMULATION CLOCK
 # ----------------------------
-class Particle:
-    def __init__(self, x, y, color, radius=4, lifetime=400):
-        self.x = x
-        self.y = y
-        self.radius = radius
-        self.color = color
-        self.lifetime = lifetime  # milliseconds
-        self.creation_time = pygame.time.get_ticks()
-        self.vel_x = random.uniform(-1.0, 1.0)
-        self.vel_y = random.uniform(-1.0, 1.0)
-        self.alpha = 255
+class SimClock:
+    """Game time in ms, advanced by main() one physics step at a time.
 
-    def update(self):
-        # Move particle
-        self.x += self.vel_x
-        self.y += self.vel_y
-        # Fade out
-        elapsed = pygame.time.get_ticks() - self.creation_time
-        self.alpha = max(0, 255 * (1 - elapsed / self.lifetime))
+    Every gameplay timer (power-ups, animations, dialog, wolf howl) reads this
+    instead of pygame.time.get_ticks(), so a run depends only on its inputs
+    and frame times and a recording replays exactly.
+    """
+    def __init__(self):
+        self.ms = 0.0
 
-    def draw(self, surf, scroll):
-        if self.alpha <= 0:
+    def reset(self):
+        self.ms = 0.0
+
+    def advance(self, ms):
+        self.ms += ms
+
+    def ticks(self):
+        return int(self.ms)
+
+
+sim_clock = SimClock()
+ticks = sim_clock.ticks
+
+# Gameplay randomness (particles); main() seeds it for every run
+rng = random.Random()
+
+
+# ----------------------------
+# PARTICLE EFFECTS
+# ----------------------------
+PARTICLE_POOL_SIZE = 4096
+PARTICLE_ALPHA_BUCKETS = 16
+PARTICLE_FRAME_MS = 1000 / 60   # velocities are in pixels per 60 Hz frame
+
+_particle_sprites = {}
+
+def particle_sprite(color, radius, bucket):
+    """Pre-rendered circle for (color, radius, alpha bucket), built on first use."""
+    key = (color, radius, bucket)
+    sprite = _particle_sprites.get(key)
+    if sprite is None:
+        alpha = min(255, (bucket + 1) * (256 // PARTICLE_ALPHA_BUCKETS) - 1)
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*color, alpha), (radius, radius), radius)
+        _particle_sprites[key] = sprite
+    return sprite
+
+
+class ParticleSystem:
+    """Fixed pool of fading particles stored in flat arrays.
+
+    Positions are derived from spawn point, velocity and age, so there is no
+    per-frame integration. Dead slots go back on a free list and are reused;
+    when the pool is full new particles are dropped.
+    """
+    def __init__(self, capacity=PARTICLE_POOL_SIZE):
+        self.capacity = capacity
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.vx = array("d", bytes(8 * capacity))
+        self.vy = array("d", bytes(8 * capacity))
+        self.born = array("d", bytes(8 * capacity))
+        self.life = array("d", bytes(8 * capacity))
+        self.radius = array("B", bytes(capacity))
+        self.color = [None] * capacity
+        self.alive = bytearray(capacity)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.top = 0          # one past the highest slot in use
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def emit(self, x, y, color, radius=4, lifetime=400):
+        vx = rng.uniform(-1.0, 1.0)
+        vy = rng.uniform(-1.0, 1.0)
+        if not self.free:
             return
-        surf_alpha = pygame.Surface((self.radius*2, self.radius*2), pygame.SRCALPHA)
-        pygame.draw.circle(surf_alpha, (*self.color, int(self.alpha)), (self.radius, self.radius), self.radius)
-        surf.blit(surf_alpha, (self.x - self.radius - scroll, self.y - self.radius))
+        i = self.free.pop()
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.born[i] = ticks()
+        self.life[i] = max(1, lifetime)
+        self.radius[i] = radius
+        self.color[i] = color
+        self.alive[i] = 1
+        if i >= self.top:
+            self.top = i + 1
+
+    def draw(self, surf, scroll):
+        now = ticks()
+        xs, ys, vxs, vys = self.x, self.y, self.vx, self.vy
+        born, life, radius, color, alive = self.born, self.life, self.radius, self.color, self.alive
+        sprites = _particle_sprites
+        buckets = PARTICLE_ALPHA_BUCKETS
+        top_bucket = buckets - 1
+        batch = []
+        append = batch.append
+        for i in range(self.top):
+            if not alive[i]:
+                continue
+            age = now - born[i]
+            fade = 1 - age / life[i]
+            if fade <= 0:
+                alive[i] = 0
+                color[i] = None
+                self.free.append(i)
+                continue
+            r = radius[i]
+            bucket = int(fade * buckets)
+            if bucket > top_bucket:
+                bucket = top_bucket
+            sprite = sprites.get((color[i], r, bucket)) or particle_sprite(color[i], r, bucket)
+            frames = age / PARTICLE_FRAME_MS
+            append((sprite, (xs[i] + vxs[i] * frames - r - scroll, ys[i] + vys[i] * frames - r)))
+        while self.top and not alive[self.top - 1]:
+            self.top -= 1
+        if batch:
+            surf.blits(batch, False)
+
+
+# ----------------------------
+# COLUMN BUCKETS (VIEW CULLING)
+# ----------------------------
+BUCKET_WIDTH = SCREEN_WIDTH
+
+class ColumnBuckets:
+    """Keeps (img, rect) pairs grouped by screen-width column ranges.
+
+    Each entry lives in the bucket of its left edge; queries widen the range
+    by the widest entry so oversized tiles starting off-screen still show up.
+    Results come back in insertion order so overlapping tiles draw the same.
+    """
+    def __init__(self, width=BUCKET_WIDTH):
+        self.width = width
+        self.clear()
+
+    def clear(self):
+        self.buckets = {}
+        self.count = 0
+        self.max_w = 0
+
+    def add(self, img, rect, order=None):
+        """`order` (default: insertion count) decides draw order across buckets."""
+        key = rect.x // self.width
+        bucket = self.buckets.setdefault(key, [])
+        bucket.append((self.count if order is None else order, img, rect))
+        if order is not None and len(bucket) > 1 and bucket[-2][0] > order:
+            bucket.sort(key=lambda item: item[0])
+        self.count += 1
+        if rect.width > self.max_w:
+            self.max_w = rect.width
+
+    def drop(self, key):
+        self.count -= len(self.buckets.pop(key, ()))
+
+    def query(self, left, right):
+        first = int((left - self.max_w) // self.width)
+        last = int(right // self.width)
+        hits = [self.buckets[k] for k in range(first, last + 1) if k in self.buckets]
+        items = hits[0] if len(hits) == 1 else heapq.merge(*hits)
+        return [(img, rect) for _, img, rect in items if rect.right > left and rect.left < right]
+
+
+# ----------------------------
+# BAKED CHUNKS (STATIC GEOMETRY)
+# ----------------------------
+BAKE_CHUNKS = False
+CHUNK_WIDTH = 1024
+CHUNK_MEMORY_CAP = 32 * 1024 * 1024   # bytes of baked pixels kept resident
+
+class ChunkCache:
+    """Level tiles pre-rendered into fixed-width strips.
+
+    Chunks are baked from the world's column buckets, so a tile that crosses a
+    chunk edge is blitted into both strips and clipped by the chunk surface.
+    When the resident chunks exceed memory_cap the ones farthest from the
+    camera are dropped and baked again the next time they come into view.
+    """
+    def __init__(self, world, width=CHUNK_WIDTH, memory_cap=CHUNK_MEMORY_CAP):
+        self.world = world
+        self.width = width
+        self.memory_cap = memory_cap
+        self.top = world.bounds.top
+        self.height = max(1, world.bounds.height)
+        self.chunk_bytes = self.width * self.height * 4
+        self.first = world.bounds.left // width
+        self.last = (world.bounds.right - 1) // width
+        self.chunks = {}
+        self.bakes = 0
+
+    def bake(self, key):
+        left = key * self.width
+        right = left + self.width
+        surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        for cols in (self.world.tile_cols, self.world.powerup_cols):
+            surf.blits([(img, (rect.x - left, rect.y - self.top)) for img, rect in cols.query(left, right)], False)
+        self.chunks[key] = surf
+        self.bakes += 1
+        return surf
+
+    def prebake(self, center=0):
+        """Bake the chunks nearest `center` (a chunk key) until the cap is reached."""
+        keys = sorted(range(self.first, self.last + 1), key=lambda k: abs(k - center))
+        for key in keys:
+            if (len(self.chunks) + 1) * self.chunk_bytes > self.memory_cap and self.chunks:
+                break
+            if key not in self.chunks:
+                self.bake(key)
+
+    def evict(self, first, last):
+        center = (first + last) / 2
+        while len(self.chunks) * self.chunk_bytes > self.memory_cap:
+            far = max(self.chunks, key=lambda k: abs(k - center))
+            if first <= far <= last:
+                break
+            del self.chunks[far]
+
+    def draw(self, surf, scroll, view_w):
+        first = max(self.first, int(scroll // self.width))
+        last = min(self.last, int((scroll + view_w - 1) // self.width))
+        for key in range(first, last + 1):
+            chunk = self.chunks.get(key) or self.bake(key)
+            surf.blit(chunk, (key * self.width - scroll, self.top))
+        self.evict(first, last)
+
+
+# ----------------------------
+# SPATIAL HASH (COLLISION QUERIES)
+# ----------------------------
+SOLID = "solid"
+KILL = "kill"
+VINE = "vine"
+SPRINT = "sprint"
+JUMPBOOST = "jumpboost"
+
+class SpatialHash:
+    """Uniform grid mapping each cell to the tagged (img, rect) entries overlapping it.
+
+    Queries return every entry of the requested kinds whose rect shares a cell
+    with the query rect, deduplicated and in insertion order, so callers that
+    resolve collisions one rect at a time behave exactly as a full scan would.
+    """
+    def __init__(self, cell=TILE_SIZE):
+        self.cell = cell
+        self.clear()
+
+    def clear(self):
+        self.cells = {}
+        self.count = 0
+
+    def _cells(self, rect):
+        c = self.cell
+        for cx in range(rect.left // c, max(rect.left, rect.right - 1) // c + 1):
+            for cy in range(rect.top // c, max(rect.top, rect.bottom - 1) // c + 1):
+                yield cx, cy
+
+    def insert(self, kind, item, order=None):
+        entry = (self.count if order is None else order, kind, item)
+        self.count += 1
+        for key in self._cells(item[1]):
+            self.cells.setdefault(key, []).append(entry)
+        return entry
+
+    def remove(self, entry):
+        for key in self._cells(entry[2][1]):
+            cell = self.cells.get(key)
+            if cell is not None:
+                cell.remove(entry)
+                if not cell:
+                    del self.cells[key]
+        self.count -= 1
+
+    def query_entries(self, rect, kinds):
+        """(order, item) pairs near `rect`, sorted by insertion order."""
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        found = {}
+        for key in self._cells(rect):
+            for order, kind, item in self.cells.get(key, ()):
+                if kind in kinds:
+                    found[order] = item
+        return sorted(found.items())
+
+    def query(self, rect, kinds):
+        return [item for _, item in self.query_entries(rect, kinds)]
+
+    def scan(self, rect, kinds, pad=TILE_SIZE):
+        """Yield entries in insertion order for a rect the caller moves while iterating.
+
+        Collision resolution pushes `rect` around between entries; whenever it
+        leaves the searched area the remaining entries are looked up again
+        around its new position, so the result matches a full list scan.
+        """
+        area = rect.inflate(pad * 2, pad * 2)
+        entries = self.query_entries(area, kinds)
+        i = 0
+        while i < len(entries):
+            order, item = entries[i]
+            i += 1
+            yield item
+            if not area.contains(rect):
+                area = rect.inflate(pad * 2, pad * 2)
+                entries = [e for e in self.query_entries(area, kinds) if e[0] > order]
+                i = 0
 
 
 # ----------------------------
 # WORLD
 # ----------------------------
+# Streaming keeps sections within this many pixels of the view indexed, and
+# drops sections more than STREAM_KEEP sections outside that range
+STREAM_MARGIN = SCREEN_WIDTH
+STREAM_KEEP = 1
+
 class World:
-    def __init__(self):
+    def __init__(self, baked=None):
+        self.baked = BAKE_CHUNKS if baked is None else baked
+        self.chunks = None
+        self.bounds = pygame.Rect(0, 0, 0, 0)
         self.tile_list = []
         self.obstacle_list = []
         self.kill_list = []
         self.vine_list = []
         self.sprint_list = []
         self.jumpboost_list = []
+        self.tile_cols = ColumnBuckets()
+        self.powerup_cols = ColumnBuckets()
+        self.grid = SpatialHash()
+        self.level = None
+        self.loaded = {}
 
+    @tracing.traced()
     def process_data(self, data):
         self.tile_list = []
         self.obstacle_list = []
-        for entry in data:
-            tile_index = entry.get("tile_index", -1)
-            grid_x = entry.get("x", 0)
-            grid_y = entry.get("y", 0)
-            scale = max(0.1, entry.get("scale", 1.0))
-            if 0 <= tile_index < len(img_list):
-                img = img_list[tile_index]
-                new_size = (int(TILE_SIZE * scale), int(TILE_SIZE * scale))
-                img = pygame.transform.scale(img, new_size)
-                px = int(grid_x * TILE_SIZE)
-                py = int(grid_y * TILE_SIZE)
-                rect = pygame.Rect(px, py, img.get_width(), img.get_height())
-                self.tile_list.append((img, rect))
-
-                # --- Platforms player can walk on ---
-                if tile_index == 5 or tile_index == 3 or (tile_index>=129 and tile_index<=133) or (tile_index>=58 and tile_index<=93):
-                    self.obstacle_list.append((img, rect))
-
-                # --- Water = Death ---
-                if tile_index == 14:
-                    kill_rect = rect.copy()
-                    kill_rect.y -= int(TILE_SIZE * 0.025)
-                    kill_rect.height += int(TILE_SIZE * 0.3)
-                    self.kill_list.append((img, kill_rect))
-                # --- Vine = Climb ---
-                if 120 <= tile_index <= 123:
-                    self.vine_list.append((img, rect))
-                # --- Sprint Power-up  ---
-                if tile_index == 113:
-                    self.sprint_list.append((img, rect))
-                # --- Jump Boost Power-up ---
-                if tile_index == 110:
-                    self.jumpboost_list.append((img, rect))
-
-
+        self.kill_list = []
+        self.vine_list = []
+        self.sprint_list = []
+        self.jumpboost_list = []
+        self.tile_cols.clear()
+        self.powerup_cols.clear()
+        self.grid.clear()
+        self.level = None
+        lists = {"tile": self.tile_list, "obstacle": self.obstacle_list, "kill": self.kill_list,
+                 "vine": self.vine_list, "sprint": self.sprint_list, "jumpboost": self.jumpboost_list}
+        for tile_index, grid_x, grid_y, scale in level_format.iter_records(data):
+            for kind, item in self._add(tile_index, grid_x, grid_y, scale):
+                lists[kind].append(item)
+
+        if self.tile_list:
+            self.bounds = self.tile_list[0][1].unionall([rect for _, rect in self.tile_list])
+        self.chunks = None
+        if self.baked and self.tile_list:
+            self.chunks = ChunkCache(self)
+            self.chunks.prebake()
+
+    def _add(self, tile_index, grid_x, grid_y, scale, order=None, grid_entries=None):
+        """Index one tile; returns the (list name, (img, rect)) pairs it belongs to.
+        Its collision grid entries are appended to `grid_entries` when given."""
+        added = []
+        grid_entries = [] if grid_entries is None else grid_entries
+        scale = max(0.1, scale)
+        if 0 <= tile_index < len(img_list):
+            new_size = (int(TILE_SIZE * scale), int(TILE_SIZE * scale))
+            img = tile_cache.get(tile_index, new_size)
+            px = int(grid_x * TILE_SIZE)
+            py = int(grid_y * TILE_SIZE)
+            rect = pygame.Rect(px, py, img.get_width(), img.get_height())
+            added.append(("tile", (img, rect)))
+            self.tile_cols.add(img, rect, order)
+
+            # --- Platforms player can walk on ---
+            if tile_index == 5 or tile_index == 3 or (tile_index>=129 and tile_index<=133) or (tile_index>=58 and tile_index<=93):
+                added.append(("obstacle", (img, rect)))
+                grid_entries.append(self.grid.insert(SOLID, (img, rect), order))
+
+            # --- Water = Death ---
+            if tile_index == 14:
+                kill_rect = rect.copy()
+                kill_rect.y -= int(TILE_SIZE * 0.025)
+                kill_rect.height += int(TILE_SIZE * 0.3)
+                added.append(("kill", (img, kill_rect)))
+                grid_entries.append(self.grid.insert(KILL, (img, kill_rect), order))
+            # --- Vine = Climb ---
+            if 120 <= tile_index <= 123:
+                added.append(("vine", (img, rect)))
+                grid_entries.append(self.grid.insert(VINE, (img, rect), order))
+            # --- Sprint Power-up  ---
+            if tile_index == 113:
+                added.append(("sprint", (img, rect)))
+                grid_entries.append(self.grid.insert(SPRINT, (img, rect), order))
+                self.powerup_cols.add(img, rect, order)
+            # --- Jump Boost Power-up ---
+            if tile_index == 110:
+                added.append(("jumpboost", (img, rect)))
+                grid_entries.append(self.grid.insert(JUMPBOOST, (img, rect), order))
+                self.powerup_cols.add(img, rect, order)
+        return added
+
+    # --- Streaming ---
+    def stream(self, level):
+        """Play a level_format.LevelSections, indexing only the sections near
+        the camera; update_stream() loads and drops them as it moves."""
+        self.process_data([])
+        self.level = level
+        self.loaded = {}
+        width = level.section_cols * TILE_SIZE
+        self.tile_cols = ColumnBuckets(width)
+        self.powerup_cols = ColumnBuckets(width)
+        # the same pixel rects _add builds, so process_data() and stream() agree
+        left, top, right, bottom = level.pixel_extent(len(img_list), TILE_SIZE)
+        self.bounds = pygame.Rect(left, top, right - left, bottom - top)
+        self.chunks = ChunkCache(self) if self.baked and level.sections else None
+
+    def _stream_range(self, left, right):
+        cols = self.level.section_cols
+        first = int((left - STREAM_MARGIN) // TILE_SIZE - self.level.max_cells) // cols
+        last = int((right + STREAM_MARGIN) // TILE_SIZE) // cols
+        return first, last
+
+    def update_stream(self, left, right):
+        """Make sure every tile overlapping [left, right) pixels is indexed."""
+        if self.level is None:
+            return
+        first, last = self._stream_range(left, right)
+        for key in [k for k in self.loaded if k < first - STREAM_KEEP or k > last + STREAM_KEEP]:
+            self._unload(key)
+        for key in range(first, last + 1):
+            if key not in self.loaded:
+                self._load(key)
+
+    def load_steps(self, level, left, right):
+        """stream() plus the first update_stream(left, right), as a generator
+        yielding ("Building world", done, total) after each section."""
+        self.stream(level)
+        first, last = self._stream_range(left, right)
+        keys = range(first, last + 1)
+        for i, key in enumerate(keys):
+            self._load(key)
+            yield "Building world", i + 1, len(keys)
+
+    @tracing.traced()
+    def _load(self, key):
+        grid_entries = []
+        for order, tile_index, grid_x, grid_y, scale in self.level.records(key):
+            self._add(tile_index, grid_x, grid_y, scale, order, grid_entries)
+        self.loaded[key] = grid_entries
+
+    def _unload(self, key):
+        self.tile_cols.drop(key)
+        self.powerup_cols.drop(key)
+        for entry in self.loaded.pop(key):
+            self.grid.remove(entry)
+
+    def query(self, rect, kinds):
+        """Entries of the given kind(s) near `rect`; callers still test for overlap."""
+        return self.grid.query(rect, kinds)
+
+    def scan(self, rect, kinds):
+        """Like query, for a rect that collision handling moves while iterating."""
+        return self.grid.scan(rect, kinds)
+
+    def visible_tiles(self, scroll, width=SCREEN_WIDTH + SIDE_MARGIN):
+        """Tiles intersecting [scroll, scroll + width], in draw order."""
+        return self.tile_cols.query(scroll, scroll + width)
+
+    @tracing.traced()
     def draw(self, surf, scroll):
-        for img, rect in self.tile_list:
-            surf.blit(img, (rect.x - scroll, rect.y))
+        if self.chunks:
+            self.chunks.draw(surf, scroll, SCREEN_WIDTH + SIDE_MARGIN)
+            return
 
-        # --- Sprint Power-up tiles ---
-        for img, rect in self.sprint_list:
-            surf.blit(img, (rect.x - scroll, rect.y))
+        right = scroll + SCREEN_WIDTH + SIDE_MARGIN
+        surf.blits([(img, (rect.x - scroll, rect.y)) for img, rect in self.tile_cols.query(scroll, right)], False)
 
-        # --- Jump Boost Power-up tiles ---
-        for img, rect in self.jumpboost_list:
-            surf.blit(img, (rect.x - scroll, rect.y))
+        # --- Power-up tiles (drawn again on top) ---
+        surf.blits([(img, (rect.x - scroll, rect.y)) for img, rect in self.powerup_cols.query(scroll, right)], False)
 
 
 # ----------------------------
@@ -273,10 +756,10 @@ class Player(pygame.sprite.Sprite):
         self.vel_y = 0.0
         self.airborne = False
         self.frame_time_ms = 1000 // 24
-        self._last_update = pygame.time.get_ticks()
+        self._last_update = ticks()
         self._current_seq = self.idle_frames
 
-        self.particles = []
+        self.particles = ParticleSystem()
 
         # --- Sprint Power-up ---
         self.sprint_active = False
@@ -299,11 +782,12 @@ class Player(pygame.sprite.Sprite):
                 sfx["jump"].play()
 
 
-    def move_and_animate(self, dx, obstacles):
+    @tracing.traced()
+    def move_and_animate(self, dx, world, dt=1.0):
         # Horizontal
         self.x += dx
         self.rect.midbottom = (int(self.x), int(self.y))
-        for _, rect in obstacles:
+        for _, rect in world.scan(self.rect, SOLID):
             if self.rect.colliderect(rect):
                 if dx > 0:
                     step_height = rect.top - self.rect.bottom
@@ -324,10 +808,10 @@ class Player(pygame.sprite.Sprite):
                 self.x = self.rect.midbottom[0]
 
         # Vertical
-        self.vel_y += GRAVITY * self.gravity_scale
-        self.y += self.vel_y
+        self.vel_y += GRAVITY * self.gravity_scale * dt
+        self.y += self.vel_y * dt
         self.rect.midbottom = (int(self.x), int(self.y))
-        for _, rect in obstacles:
+        for _, rect in world.scan(self.rect, SOLID):
             if self.rect.colliderect(rect):
                 if self.vel_y > 0:
                     self.rect.bottom = rect.top
@@ -341,17 +825,17 @@ class Player(pygame.sprite.Sprite):
         # Turn
         if dx < 0 and not self.flip:
             self.turning = True
-            self.turn_start_time = pygame.time.get_ticks()
+            self.turn_start_time = ticks()
             self.flip = True
         elif dx > 0 and self.flip:
             self.turning = True
-            self.turn_start_time = pygame.time.get_ticks()
+            self.turn_start_time = ticks()
             self.flip = False
 
         # Animation state
         if self.turning:
             seq = self.turn_frames
-            if pygame.time.get_ticks() - self.turn_start_time > self.turn_duration:
+            if ticks() - self.turn_start_time > self.turn_duration:
                 self.turning = False
         elif self.airborne:
             seq = self.jump_frames
@@ -372,7 +856,7 @@ class Player(pygame.sprite.Sprite):
             self.frame_index = 0
             self._current_seq = seq
         if self._current_seq:
-            now = pygame.time.get_ticks()
+            now = ticks()
             if now - self._last_update > self.frame_time_ms:
                 self._last_update = now
                 self.frame_index = (self.frame_index + 1) % len(self._current_seq)
@@ -384,8 +868,8 @@ class Player(pygame.sprite.Sprite):
         self.y = float(self.rect.midbottom[1])
 
 
-    def on_vine(self, vines):
-        for _, r in vines:
+    def on_vine(self, world):
+        for _, r in world.query(self.rect, VINE):
             if self.rect.colliderect(r):
                 return True
         return False
@@ -396,10 +880,10 @@ class Player(pygame.sprite.Sprite):
         self.sprint_active = True
         self.speed = self.base_speed * 1.5
         self.gravity_scale = 0.8
-        self.sprint_end_time = pygame.time.get_ticks() + duration_ms
+        self.sprint_end_time = ticks() + duration_ms
 
     def update_sprint(self):
-        if self.sprint_active and pygame.time.get_ticks() > self.sprint_end_time:
+        if self.sprint_active and ticks() > self.sprint_end_time:
             self.sprint_active = False
             self.speed = self.base_speed
             self.gravity_scale = 1.0
@@ -409,32 +893,34 @@ class Player(pygame.sprite.Sprite):
     def activate_jumpboost(self, duration_ms=5250):
         """Temporarily increase jump height."""
         self.jumpboost_active = True
-        self.jumpboost_end_time = pygame.time.get_ticks() + duration_ms
+        self.jumpboost_end_time = ticks() + duration_ms
 
     def update_jumpboost(self):
         """Deactivate boost when time runs out."""
-        if self.jumpboost_active and pygame.time.get_ticks() > self.jumpboost_end_time:
+        if self.jumpboost_active and ticks() > self.jumpboost_end_time:
             self.jumpboost_active = False
 
 
-    def draw(self, surf, scroll):
+    def draw(self, surf, scroll, midbottom=None):
+        """Draw at `midbottom` (an interpolated world position) or at self.rect."""
         # --- Particle trail for active power-ups ---
         if self.sprint_active or self.jumpboost_active:
-            for _ in range(random.randint(1, 3)):
+            for _ in range(rng.randint(1, 3)):
                 color = (0, 200, 0) if self.sprint_active else (200, 0, 0)
-                px = self.rect.centerx + random.randint(-10, 10)
-                py = self.rect.centery + random.randint(-5, 5)
-                self.particles.append(Particle(px, py, color, radius=random.randint(2, 4)))
+                px = self.rect.centerx + rng.randint(-10, 10)
+                py = self.rect.centery + rng.randint(-5, 5)
+                self.particles.emit(px, py, color, radius=rng.randint(2, 4))
 
-        # Update and draw particles
-        for particle in self.particles[:]:
-            particle.update()
-            particle.draw(surf, scroll)
-            if particle.alpha <= 0:
-                self.particles.remove(particle)
+        self.particles.draw(surf, scroll)
 
         # --- Draw player sprite ---
-        surf.blit(pygame.transform.flip(self.image, self.flip, False), (self.rect.x - scroll, self.rect.y))
+        x, y = self._draw_pos(midbottom)
+        surf.blit(animation.store.image(self.image, self.flip), (x - scroll, y))
+
+    def _draw_pos(self, midbottom):
+        if midbottom is None:
+            return self.rect.topleft
+        return (midbottom[0] - self.rect.width / 2, midbottom[1] - self.rect.height)
 
 
 # ----------------------------
@@ -457,11 +943,11 @@ class DialogBubble:
         self.active = True
         self.index = 0
         self.current_text = ""
-        self.last_update = pygame.time.get_ticks()
+        self.last_update = ticks()
 
     def update(self):
         if self.active and self.index < len(self.text):
-            now = pygame.time.get_ticks()
+            now = ticks()
             if now - self.last_update > self.delay:
                 self.current_text += self.text[self.index]
                 self.index += 1
@@ -487,7 +973,7 @@ class DialogBubble:
              (bubble_rect.x + 60, bubble_rect.bottom + 20),
              (bubble_rect.x + 80, bubble_rect.bottom)], 2
         )
-        txt_surf = self.font.render(self.current_text, True, self.color)
+        txt_surf = text_cache.render_font(self.font, self.current_text, self.color)
         surf.blit(txt_surf, (bubble_rect.x + 10, bubble_rect.y + 15))
 
 class FadeEffect:
@@ -504,13 +990,13 @@ class FadeEffect:
         self.alpha = 0
         self.done = False
 
-    def update(self):
+    def update(self, dt=1.0):
         if self.active and not self.done:
-            self.alpha += self.speed
+            self.alpha += self.speed * dt
             if self.alpha >= 255:
                 self.alpha = 255
                 self.done = True
-            self.surface.set_alpha(self.alpha)
+            self.surface.set_alpha(int(self.alpha))
 
     def draw(self, surf):
         if self.active:
@@ -532,16 +1018,16 @@ class FadeDown:
         self.done = False
         self.height = 0
 
-    def update(self):
+    def update(self, dt=1.0):
         if self.active and not self.done:
-            self.height += self.speed
+            self.height += self.speed * dt
             if self.height >= self.h:
                 self.height = self.h
                 self.done = True
 
     def draw(self, surf):
         if self.active:
-            surf.blit(self.surface, (0, 0), area=pygame.Rect(0, 0, self.surface.get_width(), self.height))
+            surf.blit(self.surface, (0, 0), area=pygame.Rect(0, 0, self.surface.get_width(), int(self.height)))
             
 # ----------------------------
 # VISUAL POWER-UP TIMERS
@@ -554,34 +1040,32 @@ def draw_powerup_timers(surf, player):
     y_offset = 60
     label_gap = 10  
 
-    font = pygame.font.SysFont("arial", 18, bold=True)
-
     # Base position — start near top-right
     x = surf.get_width() - bar_width - margin
     y = margin + y_offset
 
     # --- Sprint Timer (green) ---
     if player.sprint_active:
-        remaining = max(0, player.sprint_end_time - pygame.time.get_ticks())
+        remaining = max(0, player.sprint_end_time - ticks())
         ratio = remaining / 4000  # must match duration_ms from activate_sprint()
 
         pygame.draw.rect(surf, (60, 60, 60), (x, y, bar_width, bar_height), border_radius=6)
         pygame.draw.rect(surf, (0, 200, 0), (x, y, int(bar_width * ratio), bar_height), border_radius=6)
 
-        text = font.render("Sprint", True, (255, 255, 255))
+        text = text_cache.render("Sprint", (255, 255, 255), "arial", 18, bold=True)
         text_rect = text.get_rect(right=x - label_gap, centery=y + bar_height // 2)
         surf.blit(text, text_rect)
         y += bar_height + padding
 
     # --- Jump Boost Timer (red) ---
     if player.jumpboost_active:
-        remaining = max(0, player.jumpboost_end_time - pygame.time.get_ticks())
+        remaining = max(0, player.jumpboost_end_time - ticks())
         ratio = remaining / 5000  # must match duration_ms from activate_jumpboost()
 
         pygame.draw.rect(surf, (60, 60, 60), (x, y, bar_width, bar_height), border_radius=6)
         pygame.draw.rect(surf, (200, 0, 0), (x, y, int(bar_width * ratio), bar_height), border_radius=6)
 
-        text = font.render("Jump Boost", True, (255, 255, 255))
+        text = text_cache.render("Jump Boost", (255, 255, 255), "arial", 18, bold=True)
         text_rect = text.get_rect(right=x - label_gap, centery=y + bar_height // 2)
         surf.blit(text, text_rect)
 
@@ -590,14 +1074,13 @@ def draw_powerup_timers(surf, player):
 # TIMER (TOP-RIGHT)
 # ----------------------------
 def draw_timer(surf, start_time):
-    elapsed_ms = pygame.time.get_ticks() - start_time
+    elapsed_ms = ticks() - start_time
     seconds = elapsed_ms // 1000
     minutes = seconds // 60
     seconds = seconds % 60
 
     timer_text = f"{minutes:02}:{seconds:02}"
-    font = pygame.font.SysFont("arial", 28, bold=True)
-    text_surface = font.render(timer_text, True, (255, 255, 255))
+    text_surface = text_cache.render(timer_text, (255, 255, 255), "arial", 28, bold=True)
     surf.blit(text_surface, (surf.get_width() - 120, 20))
 
 # ----------------------------
@@ -618,14 +1101,15 @@ class Wolf(pygame.sprite.Sprite):
         self.speed = speed
         self.frame_index = 0
         self.frame_time = 1000 // 15
-        self.last_update = pygame.time.get_ticks()
+        self.last_update = ticks()
         self.running = True
         self.stop_x = target_x
         self.floor_y = floor_y
         self.rect.bottom = self.floor_y
 
-    def update(self):
-        now = pygame.time.get_ticks()
+    @tracing.traced()
+    def update(self, dt=1.0):
+        now = ticks()
 
         # Running animation
         if self.running:
@@ -634,8 +1118,10 @@ class Wolf(pygame.sprite.Sprite):
                 self.frame_index = (self.frame_index + 1) % len(self.stand_frames)
                 self.image = self.stand_frames[self.frame_index]
 
-            if self.rect.centerx + self.speed < self.stop_x:
-                self.rect.centerx += self.speed
+            step = self.speed * dt
+            if self.rect.centerx + step < self.stop_x:
+                self.x += step
+                self.rect.centerx = int(self.x)
             else:
                 # Snap and switch to idle
                 self.rect.centerx = self.stop_x
@@ -659,24 +1145,283 @@ class Wolf(pygame.sprite.Sprite):
 
         self.rect.bottom = self._ground_y_at(self.rect.centerx)
 
-    def draw(self, surf, scroll):
-        surf.blit(self.image, (self.rect.x - scroll, self.rect.y))
+    def draw(self, surf, scroll, midbottom=None):
+        if midbottom is None:
+            pos = self.rect.topleft
+        else:
+            pos = (midbottom[0] - self.rect.width / 2, midbottom[1] - self.rect.height)
+        surf.blit(animation.store.image(self.image), (pos[0] - scroll, pos[1]))
 
     def _ground_y_at(self, x_center):
-        tops = [r.top for _, r in self.world.obstacle_list if r.left <= x_center <= r.right]
+        column = pygame.Rect(x_center - 1, self.world.bounds.top, 3, max(1, self.world.bounds.height))
+        tops = [r.top for _, r in self.world.query(column, SOLID) if r.left <= x_center <= r.right]
         return min(tops) if tops else self.floor_y
+# ----------------------------
+# INTERPOLATION
+# ----------------------------
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+def lerp_point(a, b, t):
+    return (lerp(a[0], b[0], t), lerp(a[1], b[1], t))
+
+
+# ----------------------------
+# INPUT SOURCES
+# ----------------------------
+class KeyboardInput:
+    """Live window events and key state."""
+    def poll(self):
+        return pygame.event.get(), pygame.key.get_pressed()
+
+    def frame_time(self, measured_ms):
+        return measured_ms
+
+
+class HeldKeys:
+    """Stand-in for pygame.key.get_pressed() backed by a set of key codes."""
+    def __init__(self, held):
+        self.held = held
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+SCRIPT_KEYS = {"a": pygame.K_a, "d": pygame.K_d, "w": pygame.K_w, "s": pygame.K_s, "space": pygame.K_SPACE}
+
+class ScriptedInput:
+    """Plays back held keys from a script of (frame, [key names]) change points.
+
+    Key names are the ones in SCRIPT_KEYS. KEYDOWN/KEYUP events are generated
+    whenever the held set changes, so the game loop sees ordinary input.
+    """
+    def __init__(self, script):
+        self.script = sorted((int(frame), frozenset(SCRIPT_KEYS[k] for k in keys)) for frame, keys in script)
+        self.pos = 0
+        self.frame = 0
+        self.held = frozenset()
+
+    def poll(self):
+        events = [e for e in pygame.event.get() if e.type == pygame.QUIT]
+        held = self.held
+        while self.pos < len(self.script) and self.script[self.pos][0] <= self.frame:
+            held = self.script[self.pos][1]
+            self.pos += 1
+        for key in sorted(self.held - held):
+            events.append(pygame.event.Event(pygame.KEYUP, key=key))
+        for key in sorted(held - self.held):
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+        self.held = held
+        self.frame += 1
+        return events, HeldKeys(held)
+
+    def frame_time(self, measured_ms):
+        return measured_ms
+
+
+# ----------------------------
+# RECORD / REPLAY
+# ----------------------------
+# A recording holds the seed, every frame's simulated frame time, the held
+# keys and key/click events whenever they change, and a state hash per frame.
+# Replaying feeds the same frame times and input back, so the simulation
+# must reproduce every hash; the first frame that does not is reported.
+RECORDING_VERSION = 2            # 2: the state hash covers the camera scroll
+KEY_NAMES = {code: name for name, code in SCRIPT_KEYS.items()}
+
+def state_hash(player, wolf, scroll, dead, completed):
+    return zlib.crc32(struct.pack(
+        "<3d3?2i?dii3?d",
+        player.x, player.y, player.vel_y, player.airborne, player.sprint_active, player.jumpboost_active,
+        player.frame_index, ticks(), player.flip, wolf.x, wolf.rect.bottom, wolf.frame_index,
+        wolf.running, dead, completed, scroll,
+    ))
+
+
+class RecordingInput:
+    """Wraps another input source and records what it delivers."""
+    def __init__(self, source, level, path=None, seed=None):
+        self.source = source
+        self.level = level
+        self.path = path
+        self.seed = random.randrange(2**31) if seed is None else seed
+        self.timing = []
+        self.events = []
+        self.held = frozenset()
+        self.hashes = array("I")
+
+    def frame_time(self, measured_ms):
+        ms = self.source.frame_time(measured_ms)
+        self.timing.append(ms)
+        return ms
+
+    def poll(self):
+        events, keys = self.source.poll()
+        frame = len(self.timing) - 1
+        held = frozenset(name for name, code in SCRIPT_KEYS.items() if keys[code])
+        if held != self.held:
+            self.events.append([frame, "held", sorted(held)])
+            self.held = held
+        for e in events:
+            if e.type in (pygame.KEYDOWN, pygame.KEYUP) and e.key in KEY_NAMES:
+                self.events.append([frame, "down" if e.type == pygame.KEYDOWN else "up", KEY_NAMES[e.key]])
+            elif e.type == pygame.MOUSEBUTTONDOWN and e.button == 1:
+                self.events.append([frame, "click", *e.pos])
+        return events, keys
+
+    def observe(self, frame_hash):
+        self.hashes.append(frame_hash)
+
+    def save(self, path=None):
+        path = path or self.path
+        timing = []             # run-length encoded [ms, count]
+        for ms in self.timing:
+            if timing and timing[-1][0] == ms:
+                timing[-1][1] += 1
+            else:
+                timing.append([ms, 1])
+        with open(path, "w") as f:
+            json.dump({
+                "version": RECORDING_VERSION,
+                "level": self.level,
+                "seed": self.seed,
+                "frames": len(self.timing),
+                "timing": timing,
+                "events": self.events,
+                "hashes": base64.b64encode(self.hashes.tobytes()).decode("ascii"),
+            }, f)
+        return path
+
+
+class ReplayInput:
+    """Feeds a recording back frame by frame and checks its state hashes."""
+    def __init__(self, recording):
+        if recording.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version: {recording.get('version')}")
+        self.level = recording["level"]
+        self.seed = recording["seed"]
+        self.frames = recording["frames"]
+        self.timing = [ms for ms, count in recording["timing"] for _ in range(count)]
+        self.events = {}
+        for event in recording["events"]:
+            self.events.setdefault(event[0], []).append(event[1:])
+        self.hashes = array("I")
+        self.hashes.frombytes(base64.b64decode(recording["hashes"]))
+        self.frame = -1
+        self.held = frozenset()
+        self.checked = 0
+        self.diverged_at = None
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def frame_time(self, measured_ms):
+        self.frame += 1
+        return self.timing[self.frame] if self.frame < len(self.timing) else PHYSICS_STEP_MS
+
+    def poll(self):
+        events = [e for e in pygame.event.get() if e.type == pygame.QUIT]
+        for kind, *args in self.events.get(self.frame, ()):
+            if kind == "held":
+                self.held = frozenset(SCRIPT_KEYS[k] for k in args[0])
+            elif kind in ("down", "up"):
+                events.append(pygame.event.Event(pygame.KEYDOWN if kind == "down" else pygame.KEYUP,
+                                                 key=SCRIPT_KEYS[args[0]]))
+            elif kind == "click":
+                events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=tuple(args)))
+        return events, HeldKeys(self.held)
+
+    def observe(self, frame_hash):
+        if self.frame < len(self.hashes):
+            self.checked += 1
+            if self.diverged_at is None and self.hashes[self.frame] != frame_hash:
+                self.diverged_at = self.frame
+
+
 # ----------------------------
 # MAIN LOOP
 # ----------------------------
-def main(selected_level="Demo.json"):
+# ----------------------------
+# LOADING SCREEN
+# ----------------------------
+# Levels load through generators (level_format.iter_open_sections, then
+# World.load_steps) that run LOAD_BUDGET_MS of work per frame; in between
+# the loading screen draws progress and keeps the window responsive. Only
+# the sections around the start are built before play begins; the rest
+# stream in as the camera moves.
+def load_level_steps(level_path, world):
+    level = yield from level_format.iter_open_sections(level_path)
+    yield from world.load_steps(level, 0, SCREEN_WIDTH + SIDE_MARGIN)
+
+def draw_loading_screen(surf, stage, done, total):
+    w, h = surf.get_size()
+    bar = pygame.Rect(0, 0, w // 2, 24)
+    bar.center = (w // 2, h // 2)
+    surf.fill(GAME_BG)
+    label = text_cache.render(f"{stage}...", (230, 230, 230), "arial", 28, bold=True)
+    surf.blit(label, label.get_rect(midbottom=(bar.centerx, bar.top - 12)))
+    pygame.draw.rect(surf, (60, 60, 60), bar, border_radius=12)
+    if total:
+        fill = bar.copy()
+        fill.width = bar.width * min(done, total) // total
+        pygame.draw.rect(surf, (180, 180, 180), fill, border_radius=12)
+    pygame.draw.rect(surf, (180, 180, 180), bar, width=2, border_radius=12)
+
+def run_loading(steps, headless=False, budget_ms=LOAD_BUDGET_MS):
+    """Drive a loading generator a time slice per frame; returns its result."""
+    progress = None
+    while True:
+        deadline = time.perf_counter() + budget_ms / 1000
+        try:
+            while True:
+                progress = next(steps)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration as done:
+            return done.value
+        if headless:
+            continue
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        draw_loading_screen(screen, *progress)
+        pygame.display.flip()
+        clock.tick()        # uncapped: the budget already leaves time to draw
+
+
+def main(selected_level="Demo.json", headless=HEADLESS, frames=None, input_source=None):
+    """Play a level.
+
+    In headless mode the loop runs uncapped, never presents, and stops after
+    `frames` frames or on death/level completion, returning a summary dict.
+    RUN_RED_RECORD=<file> records the session's input; RUN_RED_REPLAY=<file>
+    plays one back (see RecordingInput / ReplayInput).
+    """
+    if input_source is None:
+        if os.environ.get("RUN_RED_REPLAY"):
+            input_source = ReplayInput.load(os.environ["RUN_RED_REPLAY"])
+            selected_level = input_source.level
+        elif os.environ.get("RUN_RED_RECORD"):
+            input_source = RecordingInput(KeyboardInput(), selected_level, os.environ["RUN_RED_RECORD"])
+        else:
+            input_source = KeyboardInput()
+    sim_clock.reset()
+    rng.seed(getattr(input_source, "seed", None))
+    observe = getattr(input_source, "observe", None)
+
     level_path = PROJECT_ROOT / "src" / "levels" / selected_level
     if not level_path.exists():
         raise FileNotFoundError(f"Level not found: {level_path}")
 
-    with open(level_path) as f:
-        level_data = json.load(f)
+    world_instance = World()
+    with tracing.span("load_level", level=selected_level):
+        run_loading(load_level_steps(level_path, world_instance), headless)
+    max_scroll = max(0, world_instance.bounds.right - (SCREEN_WIDTH + SIDE_MARGIN))
 
-    wolf_timer = pygame.time.get_ticks()
+    wolf_timer = ticks()
     if sfx.get("wolfhowl") is None:
         sfx["wolfhowl"] = pygame.mixer.Sound(str(ASSETS_ROOT / "sfx" / "wolfhowl.wav"))
 
@@ -685,16 +1430,13 @@ def main(selected_level="Demo.json"):
 
     level_complete_time = None
     play_game_music()
-    start_time = pygame.time.get_ticks()
+    start_time = ticks()
     stop_timer = False
 
     # --- Load selected level ---
 
 
 
-    world_instance = World()
-    world_instance.process_data(level_data)
-
     player = Player(
         PLAYER_IDLE_FRAMES, PLAYER_RUN, PLAYER_CLIMB, PLAYER_JUMP, PLAYER_TURN,
         100, BASELINE_Y, PLAYER_FOOT_OFFSET
@@ -708,7 +1450,7 @@ def main(selected_level="Demo.json"):
         world=world_instance
     )
 
-    font = pygame.font.SysFont("arial", 24, bold=True)
+    font = text_cache.get_font("arial", 24, bold=True)
     HOUSE_ZONE_MIN = 266 * TILE_SIZE + 280
     HOUSE_ZONE_MAX = 269 * TILE_SIZE + 280
     HOUSE_BUBBLE_X = 270 * TILE_SIZE + (TILE_SIZE * 1.0)
@@ -735,18 +1477,40 @@ def main(selected_level="Demo.json"):
     WOLF_BUBBLE_WIDTH = 320
     WOLF_BUBBLE_HEIGHT = 60
 
+    frame = 0
+    sim_start = time.perf_counter()
+
+    perf = perf_hud.PerfHUD(FPS)
+    accumulator = 0.0
+    prev_player = player.rect.midbottom
+    prev_wolf = wolf.rect.midbottom
+    prev_scroll = scroll
+
     running = True
     while running:
-        clock.tick(FPS)
+        if headless:
+            if (frames is not None and frame >= frames) or dead or end_sequence:
+                break
+            clock.tick()
+            frame_ms = PHYSICS_STEP_MS
+        else:
+            frame_ms = clock.tick(FPS)
+        frame_ms = input_source.frame_time(frame_ms)
+        perf.begin_frame()
+        frame += 1
+        tracing.frame(frame)
         screen.fill(GAME_BG)
-        dx = 0
 
-        for event in pygame.event.get():
+        events, keys = input_source.poll()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                perf.toggle()
             if event.type == pygame.MOUSEBUTTONDOWN and dead and restart_button_rect and restart_button_rect.collidepoint(event.pos):
-                main(selected_level)
-                return
+                if observe:
+                    observe(state_hash(player, wolf, scroll, dead, end_sequence))
+                return main(selected_level, headless, frames, input_source)
             if not dead:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_a: moving_left = True
@@ -755,50 +1519,142 @@ def main(selected_level="Demo.json"):
                 if event.type == pygame.KEYUP:
                     if event.key == pygame.K_a: moving_left = False
                     if event.key == pygame.K_d: moving_right = False
+        perf.mark("events")
 
-        # Wolf collision kills Red
-        wolf_hitbox = wolf.rect.copy()
-        wolf_hitbox.width += 40
-        wolf_hitbox.x -= 20
-        if not dead and player.rect.colliderect(wolf_hitbox):
-            dead = True
-            stop_timer = True
-            moving_left = moving_right = False
-            pygame.mixer.music.stop()
-            if sfx.get("lose") and not lose_sound_played:
-                sfx["lose"].play()
-                lose_sound_played = True
-            lose_fade.start()
-
-        # Movement & scroll
-        if not fade.active and not dead:
-            dx = (-player.speed if moving_left else player.speed if moving_right else 0)
-        else:
-            dx = 0
+        # ----------------------------
+        # PHYSICS (fixed steps)
+        # ----------------------------
+        accumulator += min(frame_ms, MAX_FRAME_MS)
+        while accumulator >= PHYSICS_STEP_MS:
+            accumulator -= PHYSICS_STEP_MS
+            sim_clock.advance(PHYSICS_STEP_MS)
+            prev_player = player.rect.midbottom
+            prev_wolf = wolf.rect.midbottom
+            prev_scroll = scroll
+
+            # Wolf collision kills Red
+            wolf_hitbox = wolf.rect.copy()
+            wolf_hitbox.width += 40
+            wolf_hitbox.x -= 20
+            if not dead and player.rect.colliderect(wolf_hitbox):
+                dead = True
+                stop_timer = True
+                moving_left = moving_right = False
+                pygame.mixer.music.stop()
+                if sfx.get("lose") and not lose_sound_played:
+                    sfx["lose"].play()
+                    lose_sound_played = True
+                lose_fade.start()
+
+            # Movement & scroll
+            if not fade.active and not dead:
+                dx = (-player.speed if moving_left else player.speed if moving_right else 0) * STEP_SCALE
+            else:
+                dx = 0
 
-        screen_center_x = SCREEN_WIDTH // 2
-        player_screen_x = player.x - scroll
-        if not dead:
-            if player_screen_x > screen_center_x and dx > 0:
-                scroll += dx
-            elif player_screen_x < screen_center_x and dx < 0:
-                scroll += dx
-        scroll = max(0, min(scroll, MAX_SCROLL))
-        player.rect.midbottom = (int(player.x), int(player.y))
-
-        # Background
-        for i in range(16):
-            offset_x = i * sky_img.get_width()
-            screen.blit(sky_img, (offset_x - scroll * 0.4, 0))
-            screen.blit(mountain_img, (offset_x - scroll * 0.6, SCREEN_HEIGHT - mountain_img.get_height() - 260))
-            screen.blit(pine1_img, (offset_x - scroll * 0.7, SCREEN_HEIGHT - pine1_img.get_height() - 100))
-            screen.blit(pine2_img, (offset_x - scroll * 0.8, SCREEN_HEIGHT - pine2_img.get_height() + 20))
-
-        world_instance.draw(screen, scroll)
+            screen_center_x = SCREEN_WIDTH // 2
+            player_screen_x = player.x - scroll
+            if not dead:
+                if player_screen_x > screen_center_x and dx > 0:
+                    scroll += dx
+                elif player_screen_x < screen_center_x and dx < 0:
+                    scroll += dx
+            scroll = max(0, min(scroll, max_scroll))
+            world_instance.update_stream(scroll, scroll + SCREEN_WIDTH + SIDE_MARGIN)
+            player.rect.midbottom = (int(player.x), int(player.y))
+
+            if not dead:
+                player.move_and_animate(dx, world_instance, STEP_SCALE)
+                wolf.update(STEP_SCALE)
+
+                # Power-ups
+                for _, rect in world_instance.query(player.rect, SPRINT):
+                    if player.rect.colliderect(rect):
+                        player.activate_sprint()
+                        if sfx.get("powerup"):
+                            sfx["powerup"].play()
+                        break
+
+                for _, rect in world_instance.query(player.rect, JUMPBOOST):
+                    if player.rect.colliderect(rect):
+                        player.activate_jumpboost()
+                        if sfx.get("powerup"):
+                            sfx["powerup"].play()
+                        #world_instance.jumpboost_list.remove((_, rect))
+                        break
+
+                # Vine climbing
+                on_vine = player.on_vine(world_instance)
+                if on_vine:
+                    player.animate(player.climb_frames)
+                    climb_speed = player.speed * 0.6 * STEP_SCALE
+                    moving_vertically = False
+                    if keys[pygame.K_w]:
+                        player.y -= climb_speed
+                        player.vel_y = 0
+                        player.airborne = False
+                        moving_vertically = True
+                    elif keys[pygame.K_s]:
+                        player.y += climb_speed
+                        player.vel_y = 0
+                        player.airborne = False
+                        moving_vertically = True
+                    player.rect.midbottom = (int(player.x), int(player.y))
+                    for _, rect in world_instance.scan(player.rect, SOLID):
+                        if player.rect.colliderect(rect):
+                            if keys[pygame.K_w]:
+                                player.rect.top = rect.bottom
+                            elif keys[pygame.K_s]:
+                                player.rect.bottom = rect.top
+                            player.y = player.rect.midbottom[1]
+                    if not moving_vertically:
+                        player.airborne = True
+
+                # Death zones
+                for _, rect in world_instance.query(player.rect, KILL):
+                    if player.rect.colliderect(rect):
+                        dead = True
+                        stop_timer = True
+                        moving_left = moving_right = False
+                        pygame.mixer.music.stop()
+                        if sfx.get("lose") and not lose_sound_played:
+                            sfx["lose"].play()
+                            lose_sound_played = True
+                        lose_fade.start()
+                        break
+
+                # Ending logic
+                if (not end_sequence) and (HOUSE_ZONE_MIN <= player.x <= HOUSE_ZONE_MAX):
+                    stop_timer = True
+                    finish_time_ms = ticks() - start_time
+                    if sfx.get("win"):
+                        pygame.mixer.music.stop()
+                        sfx["win"].play()
+                    end_sequence = True
+                    moving_left = moving_right = False
+                    idle_start_time = ticks()
+
+            fade.update(STEP_SCALE)
+            if dead:
+                lose_fade.update(STEP_SCALE)
+            player.update_sprint()
+            player.update_jumpboost()
+        perf.mark("physics")
+
+        # ----------------------------
+        # RENDER (interpolated between the last two physics states)
+        # ----------------------------
+        alpha = accumulator / PHYSICS_STEP_MS
+        view_scroll = lerp(prev_scroll, scroll, alpha)
+
+        draw_background(screen, view_scroll)
+        perf.mark("bg")
+
+        world_instance.draw(screen, view_scroll)
 
         # --- Wolf speech bubble (anchored to world x=0–4, y≈14) ---
 
-        bubble_screen_x = WOLF_BUBBLE_WORLD_X - scroll
+        bubble_screen_x = WOLF_BUBBLE_WORLD_X - view_scroll
         bubble_screen_y = WOLF_BUBBLE_WORLD_Y + 40  # lower bubble slightly
         wolf_bubble_rect = pygame.Rect(bubble_screen_x, bubble_screen_y, WOLF_BUBBLE_WIDTH, WOLF_BUBBLE_HEIGHT)
 
@@ -826,109 +1682,34 @@ def main(selected_level="Demo.json"):
         # ----------------------------
 
         if not dead:
-            player.move_and_animate(dx, world_instance.obstacle_list)
-            wolf.update()
-
-            # Power-ups
-            for _, rect in world_instance.sprint_list[:]:
-                if player.rect.colliderect(rect):
-                    player.activate_sprint()
-                    if sfx.get("powerup"):
-                        sfx["powerup"].play()
-                    break
-
-            for _, rect in world_instance.jumpboost_list[:]:
-                if player.rect.colliderect(rect):
-                    player.activate_jumpboost()
-                    if sfx.get("powerup"):
-                        sfx["powerup"].play()
-                    #world_instance.jumpboost_list.remove((_, rect))
-                    break
-
-            # Vine climbing
-            on_vine = player.on_vine(world_instance.vine_list)
-            keys = pygame.key.get_pressed()
-            if on_vine:
-                player.animate(player.climb_frames)
-                climb_speed = player.speed * 0.6
-                moving_vertically = False
-                if keys[pygame.K_w]:
-                    player.y -= climb_speed
-                    player.vel_y = 0
-                    player.airborne = False
-                    moving_vertically = True
-                elif keys[pygame.K_s]:
-                    player.y += climb_speed
-                    player.vel_y = 0
-                    player.airborne = False
-                    moving_vertically = True
-                player.rect.midbottom = (int(player.x), int(player.y))
-                for _, rect in world_instance.obstacle_list:
-                    if player.rect.colliderect(rect):
-                        if keys[pygame.K_w]:
-                            player.rect.top = rect.bottom
-                        elif keys[pygame.K_s]:
-                            player.rect.bottom = rect.top
-                        player.y = player.rect.midbottom[1]
-                if not moving_vertically:
-                    player.airborne = True
-
-            # Death zones
-            for _, rect in world_instance.kill_list:
-                if player.rect.colliderect(rect):
-                    dead = True
-                    stop_timer = True
-                    moving_left = moving_right = False
-                    pygame.mixer.music.stop()
-                    if sfx.get("lose") and not lose_sound_played:
-                        sfx["lose"].play()
-                        lose_sound_played = True
-                    lose_fade.start()
-                    break
-
-            # Ending logic
-            if (not end_sequence) and (HOUSE_ZONE_MIN <= player.x <= HOUSE_ZONE_MAX):
-                stop_timer = True
-                finish_time_ms = pygame.time.get_ticks() - start_time
-                if sfx.get("win"):
-                    pygame.mixer.music.stop()
-                    sfx["win"].play()
-                end_sequence = True
-                moving_left = moving_right = False
-                idle_start_time = pygame.time.get_ticks()
-
             if end_sequence and not dialog.active:
-                if pygame.time.get_ticks() - idle_start_time > 1000:
+                if ticks() - idle_start_time > 1000:
                     dialog.start()
             if end_sequence:
                 dialog.update()
-                dialog.draw(screen, scroll)
+                dialog.draw(screen, view_scroll)
                 if dialog.active and dialog.index >= len(dialog.text) and not fade.active:
                     fade.start()
 
-        fade.update()
         fade.draw(screen)
 
         if fade.done and not showed_complete:
             showed_complete = True
 
         if showed_complete:
-            title_font = pygame.font.SysFont("arial", 60, bold=True)
-            msg = title_font.render("Level #1 DEMO Complete!", True, (255, 255, 255))
+            msg = text_cache.render("Level #1 DEMO Complete!", (255, 255, 255), "arial", 60, bold=True)
             #timer text right inder here that says "Score: the time it took to reach the house/end should be displayed on teh ending screen just like the msg above"
             rect = msg.get_rect(center=((SCREEN_WIDTH + SIDE_MARGIN)//2,
                                         (SCREEN_HEIGHT + LOWER_MARGIN)//2))
             screen.blit(msg, rect)
                 # --- FINAL SCORE UNDER MESSAGE ---
-            score_font = pygame.font.SysFont("arial", 40, bold=True)
-
             # Convert ms → mm:ss
             total_seconds = finish_time_ms // 1000
             minutes = total_seconds // 60
             seconds = total_seconds % 60
             final_timer_text = f"Your Score: {minutes:02}:{seconds:02}"
 
-            score_surf = score_font.render(final_timer_text, True, (255, 255, 255))
+            score_surf = text_cache.render(final_timer_text, (255, 255, 255), "arial", 40, bold=True)
             score_rect = score_surf.get_rect(center=(
                 (SCREEN_WIDTH + SIDE_MARGIN)//2,
                 (SCREEN_HEIGHT + LOWER_MARGIN)//2 + 80
@@ -937,26 +1718,24 @@ def main(selected_level="Demo.json"):
             screen.blit(score_surf, score_rect)
 
         else:
-            player.draw(screen, scroll)
-            wolf.draw(screen, scroll)
+            player.draw(screen, view_scroll, lerp_point(prev_player, player.rect.midbottom, alpha))
+            wolf.draw(screen, view_scroll, lerp_point(prev_wolf, wolf.rect.midbottom, alpha))
+        perf.mark("world")
 
         # Wolf howl once
-        if sfx.get("wolfhowl") and pygame.time.get_ticks() - wolf_timer > 7000:
+        if sfx.get("wolfhowl") and ticks() - wolf_timer > 7000:
             sfx["wolfhowl"].play()
             sfx["wolfhowl"] = None
 
         # Game Over
         if dead:
-            lose_fade.update()
             lose_fade.draw(screen)
-            go_font = pygame.font.SysFont("arial", 120, bold=True)
-            go_text = go_font.render("GAME OVER", True, (255, 0, 0))
+            go_text = text_cache.render("GAME OVER", (255, 0, 0), "arial", 120, bold=True)
             go_rect = go_text.get_rect(center=((SCREEN_WIDTH + SIDE_MARGIN)//2,
                                                (SCREEN_HEIGHT + LOWER_MARGIN)//2 - 80))
             screen.blit(go_text, go_rect)
             if lose_fade.done:
-                btn_font = pygame.font.SysFont("arial", 48, bold=True)
-                btn_text = btn_font.render("Restart Level", True, (255, 255, 255))
+                btn_text = text_cache.render("Restart Level", (255, 255, 255), "arial", 48, bold=True)
                 btn_rect = btn_text.get_rect(center=((SCREEN_WIDTH + SIDE_MARGIN)//2,
                                                      (SCREEN_HEIGHT + LOWER_MARGIN)//2 + 80))
                 pad = 20
@@ -966,14 +1745,41 @@ def main(selected_level="Demo.json"):
                 screen.blit(btn_text, btn_rect)
                 restart_button_rect = bg_rect
 
-        player.update_sprint()
-        player.update_jumpboost()
-
         if not dead and not stop_timer and not fade.active:
             draw_timer(screen, start_time)
             draw_powerup_timers(screen, player)
-
-        pygame.display.flip()
+        perf.draw(screen)
+        perf.mark("hud")
+
+        if not headless:
+            pygame.display.flip()
+        perf.mark("present")
+        if observe:
+            observe(state_hash(player, wolf, scroll, dead, end_sequence))
+
+    if isinstance(input_source, RecordingInput) and input_source.path:
+        input_source.save()
+
+    if headless:
+        wall_time = time.perf_counter() - sim_start
+        pygame.mixer.music.stop()
+        return {
+            "level": selected_level,
+            "frames": frame,
+            "wall_time": wall_time,
+            "fps": frame / wall_time if wall_time > 0 else 0.0,
+            "player": {
+                "x": player.x,
+                "y": player.y,
+                "vel_y": player.vel_y,
+                "airborne": player.airborne,
+                "sprint_active": player.sprint_active,
+                "jumpboost_active": player.jumpboost_active,
+            },
+            "scroll": scroll,
+            "dead": dead,
+            "completed": end_sequence,
+        }
 
     pygame.mixer.music.fadeout(2000)
     pygame.quit()
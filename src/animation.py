@@ -0,0 +1,59 @@
+# This file keeps animation frames together with their mirrored copies
+#
+# Every frame registered with the store gets its horizontally flipped surface,
+# collision masks and opaque bounding boxes built once, at load time. Drawing
+# a facing-left sprite is then a dictionary lookup instead of a per-frame
+# pygame.transform.flip.
+
+import pygame
+
+
+class Frame:
+    """One animation frame and everything derived from it."""
+    __slots__ = ("image", "flipped", "mask", "flipped_mask", "bounds", "flipped_bounds")
+
+    def __init__(self, image):
+        self.image = image
+        self.flipped = pygame.transform.flip(image, True, False)
+        self.mask = pygame.mask.from_surface(image)
+        self.flipped_mask = pygame.mask.from_surface(self.flipped)
+        self.bounds = image.get_bounding_rect()
+        self.flipped_bounds = self.flipped.get_bounding_rect()
+
+    def get(self, flip=False):
+        return self.flipped if flip else self.image
+
+
+class FrameStore:
+    """Frames keyed by their source surface, plus named sequences."""
+    def __init__(self):
+        self.frames = {}
+        self.sequences = {}
+
+    def add(self, name, images):
+        """Register a sequence; returns the same list of surfaces for the caller to keep."""
+        for image in images:
+            if image not in self.frames:
+                self.frames[image] = Frame(image)
+        self.sequences[name] = images
+        return images
+
+    def frame(self, image):
+        frame = self.frames.get(image)
+        if frame is None:
+            frame = self.frames[image] = Frame(image)
+        return frame
+
+    def image(self, image, flip=False):
+        return self.frame(image).get(flip)
+
+    def mask(self, image, flip=False):
+        frame = self.frame(image)
+        return frame.flipped_mask if flip else frame.mask
+
+    def bounds(self, image, flip=False):
+        frame = self.frame(image)
+        return frame.flipped_bounds if flip else frame.bounds
+
+
+store = FrameStore()
@@ -0,0 +1,205 @@
+# This file decodes image and sound files on a thread pool
+#
+# prefetch() queues files for decoding on worker threads (PNG and WAV decoding
+# in pygame runs without holding the GIL). image() / sound() then pick the
+# result up on the calling thread, which is where convert_alpha() has to run.
+# Files that were never prefetched are simply decoded inline.
+#
+# A progress hook, if set, is called as fn(done, total) every time a
+# prefetched file is collected, so a loading screen can draw a bar.
+#
+# Images also go through an on-disk cache of raw RGBA pixels, already scaled.
+# Entries are keyed by the source file's content hash, the scale and the
+# pixel format, so editing a PNG simply misses (and the stale entries of that
+# file are deleted). A warm start reads raw bytes instead of decoding and
+# scaling. Delete .asset_cache/ (or set ASSET_CACHE = False) to opt out.
+
+import os
+import json
+import atexit
+import struct
+import hashlib
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+import tracing
+
+LOADER_WORKERS = min(8, os.cpu_count() or 1)
+
+ASSET_CACHE = True
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".asset_cache"
+CACHE_FORMAT = "RGBA"
+ENTRY_HEADER = struct.Struct("<4sII")   # magic, width, height
+ENTRY_MAGIC = b"RRAC"
+
+_pool = None
+_pending = {}
+_total = 0
+_done = 0
+_progress_hook = None
+
+
+def set_progress_hook(fn):
+    global _progress_hook
+    _progress_hook = fn
+
+
+def progress():
+    return _done, _total
+
+
+# ----------------------------
+# DISK CACHE
+# ----------------------------
+_index = None          # source path -> [mtime_ns, size, digest]
+_index_dirty = False
+
+
+def _load_index():
+    global _index
+    if _index is None:
+        try:
+            with open(CACHE_DIR / "index.json") as f:
+                _index = json.load(f)
+        except (OSError, ValueError):
+            _index = {}
+    return _index
+
+
+@atexit.register
+def save_index():
+    global _index_dirty
+    if not _index_dirty:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(CACHE_DIR / "index.json", "w") as f:
+            json.dump(_index, f)
+        _index_dirty = False
+    except OSError:
+        pass
+
+
+def digest(path):
+    """Content hash of a source file; re-hashed only when its mtime or size changes."""
+    global _index_dirty
+    index = _load_index()
+    st = os.stat(path)
+    known = index.get(path)
+    if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+        return known[2]
+    with open(path, "rb") as f:
+        h = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    if known and known[2] != h:
+        for stale in CACHE_DIR.glob(f"{known[2]}_*.raw"):
+            stale.unlink(missing_ok=True)
+    index[path] = [st.st_mtime_ns, st.st_size, h]
+    _index_dirty = True
+    return h
+
+
+def _entry_path(h, scale):
+    return CACHE_DIR / f"{h}_{scale:g}_{CACHE_FORMAT}.raw"
+
+
+def _read_entry(entry):
+    try:
+        with open(entry, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < ENTRY_HEADER.size:
+        return None         # empty or cut short; decode the source instead
+    magic, w, h = ENTRY_HEADER.unpack_from(data)
+    pixels = memoryview(data)[ENTRY_HEADER.size:]
+    if magic != ENTRY_MAGIC or len(pixels) != w * h * 4:
+        return None
+    return (w, h), pixels
+
+
+def _write_entry(entry, surf):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # a unique temp name, so concurrent writers of one entry never share a file
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix=entry.name + ".", suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(ENTRY_HEADER.pack(ENTRY_MAGIC, *surf.get_size()))
+            f.write(pygame.image.tobytes(surf, CACHE_FORMAT))
+        os.replace(tmp, entry)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+# ----------------------------
+# LOADING
+# ----------------------------
+def _decode_image(path, scale=1.0):
+    """Worker side: (surface, cache entry to fill, whether it came from the cache)."""
+    entry = _entry_path(digest(path), scale) if ASSET_CACHE else None
+    cached = _read_entry(entry) if entry else None
+    if cached:
+        size, pixels = cached
+        return pygame.image.frombuffer(pixels, size, CACHE_FORMAT), None, True
+    return pygame.image.load(path), entry, False
+
+
+def _decode_sound(path, scale=1.0):
+    return pygame.mixer.Sound(path)
+
+
+def prefetch(paths, kind="image", scale=1.0):
+    """Start decoding `paths` in the background; missing files are skipped."""
+    global _pool, _total
+    decode = _decode_sound if kind == "sound" else _decode_image
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=LOADER_WORKERS, thread_name_prefix="asset")
+    if ASSET_CACHE:
+        _load_index()
+    for path in paths:
+        if path is None:
+            continue
+        key = (str(path), scale)
+        if key not in _pending and os.path.exists(key[0]):
+            _pending[key] = _pool.submit(decode, *key)
+            _total += 1
+
+
+def _take(path, decode, scale=1.0):
+    global _done
+    future = _pending.pop((str(path), scale), None)
+    if future is None:
+        return decode(str(path), scale)
+    try:
+        return future.result()
+    finally:
+        _done += 1
+        if _progress_hook:
+            _progress_hook(_done, _total)
+
+
+def image(path, scale=1.0):
+    """Decoded image scaled by `scale`, converted for the display when one is set."""
+    with tracing.span("asset_loader.image", "assets", path=str(path), scale=scale):
+        surf, entry, cached = _take(path, _decode_image, scale)
+        if pygame.display.get_surface():
+            surf = surf.convert_alpha()
+        if not cached:
+            if scale != 1.0:
+                surf = pygame.transform.scale(surf, (int(surf.get_width() * scale), int(surf.get_height() * scale)))
+            if entry is not None:
+                _write_entry(entry, surf)
+        return surf
+
+
+def sound(path):
+    with tracing.span("asset_loader.sound", "assets", path=str(path)):
+        return _take(path, _decode_sound)
@@ -0,0 +1,150 @@
+# This file packs animation frames into sprite sheets and loads them back
+#
+# An atlas is one PNG plus a JSON file describing frame rects:
+#
+#   {"image": "red.png", "sequences": {"red_run": [[x, y, w, h], ...], ...}}
+#
+# Loading decodes the PNG once and hands out frames as subsurfaces, so every
+# frame of a character shares one pixel buffer. Scaled atlases scale the
+# whole sheet once; frames are packed with transparent padding so rounding at
+# the edges never picks up a neighbour.
+#
+#   python atlas.py pack              # rebuild assets/atlas/ from the frame PNGs
+#   python atlas.py grid <sheet.png> <frame_w> <frame_h> <name> <out.json>
+#                                     # describe an existing strip/grid sheet
+
+import os
+import sys
+import json
+from pathlib import Path
+
+import pygame
+
+import asset_loader
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ASSETS_ROOT = PROJECT_ROOT / "assets"
+ATLAS_ROOT = ASSETS_ROOT / "atlas"
+PADDING = 2
+MAX_SHEET_WIDTH = 1024
+
+# Sequences the game draws, in frame order (matches Test.py / main.py)
+PACK_SPECS = {
+    "red": {
+        "red_idle":  [f"red_idle_{i}.png" for i in range(1, 9)],
+        "red_run":   [f"red_run_{i}.png" for i in range(1, 24)],
+        "red_climb": [f"red_wallslide_{i}.png" for i in range(1, 5)],
+        "red_jump":  [f"red_jump_{i}.png" for i in range(1, 13)],
+        "red_turn":  [f"red_turn_{i}.png" for i in range(1, 3)],
+    },
+    "wolf": {
+        "wolf_stand": [f"wolf_stand_{i}.png" for i in range(1, 8)],
+        "wolf_idle":  [f"wolf_idle_{i}.png" for i in range(1, 8)],
+    },
+}
+
+
+class Atlas:
+    """A decoded sheet (optionally pre-scaled) and its named frame rects."""
+    def __init__(self, meta_path, scale=1.0):
+        meta_path = Path(meta_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.sheet = asset_loader.image(meta_path.parent / meta["image"], scale)
+        self.scale = scale
+        self.sequences = meta["sequences"]
+
+    def rect(self, x, y, w, h):
+        s = self.scale
+        return pygame.Rect(int(x * s), int(y * s), int(w * s), int(h * s))
+
+    def frames(self, name):
+        return [self.sheet.subsurface(self.rect(*r)) for r in self.sequences[name]]
+
+
+def image_path(meta_path):
+    """Path of the sheet an atlas uses (None when the atlas has not been built)."""
+    meta_path = Path(meta_path)
+    if not meta_path.exists():
+        return None
+    with open(meta_path) as f:
+        return meta_path.parent / json.load(f)["image"]
+
+
+def load(meta_path, scale=1.0):
+    """The atlas at meta_path, or None when it has not been built."""
+    if not Path(meta_path).exists():
+        return None
+    return Atlas(meta_path, scale)
+
+
+def frames_or(sheet, name, fallback):
+    """Frames from an atlas when it has `name`, otherwise fallback()."""
+    if sheet is not None and name in sheet.sequences:
+        return sheet.frames(name)
+    return fallback()
+
+
+# ----------------------------
+# PACKING
+# ----------------------------
+def pack(sequences, max_width=MAX_SHEET_WIDTH, padding=PADDING):
+    """Shelf-pack {name: [Surface, ...]} into one sheet; returns (sheet, {name: [rect, ...]})."""
+    items = [(name, i, img) for name, imgs in sequences.items() for i, img in enumerate(imgs)]
+    order = sorted(items, key=lambda item: -item[2].get_height())
+    placed = {}
+    x = y = padding
+    shelf_h = 0
+    width = 0
+    for name, i, img in order:
+        w, h = img.get_size()
+        if x + w + padding > max_width and x > padding:
+            x = padding
+            y += shelf_h + padding
+            shelf_h = 0
+        placed[(name, i)] = (x, y, w, h)
+        x += w + padding
+        width = max(width, x)
+        shelf_h = max(shelf_h, h)
+    height = y + shelf_h + padding
+
+    sheet = pygame.Surface((max(1, width), max(1, height)), pygame.SRCALPHA)
+    sheet.fill((0, 0, 0, 0))
+    for name, i, img in items:
+        x, y, _, _ = placed[(name, i)]
+        sheet.blit(img, (x, y))
+    rects = {name: [list(placed[(name, i)]) for i in range(len(imgs))] for name, imgs in sequences.items()}
+    return sheet, rects
+
+
+def build(name, spec, src_dir=ASSETS_ROOT, out_dir=ATLAS_ROOT):
+    sequences = {seq: [pygame.image.load(str(src_dir / f)) for f in files] for seq, files in spec.items()}
+    sheet, rects = pack(sequences)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pygame.image.save(sheet, str(out_dir / f"{name}.png"))
+    with open(out_dir / f"{name}.json", "w") as f:
+        json.dump({"image": f"{name}.png", "sequences": rects}, f, indent=1)
+    return out_dir / f"{name}.json"
+
+
+def grid_meta(sheet_path, frame_w, frame_h, name, out_path):
+    """Metadata for an existing sheet laid out as a grid of equal cells."""
+    sheet_path, out_path = Path(sheet_path).resolve(), Path(out_path).resolve()
+    w, h = pygame.image.load(str(sheet_path)).get_size()
+    rects = [[x, y, frame_w, frame_h] for y in range(0, h - frame_h + 1, frame_h)
+             for x in range(0, w - frame_w + 1, frame_w)]
+    image = Path(os.path.relpath(sheet_path, out_path.parent)).as_posix()
+    with open(out_path, "w") as f:
+        json.dump({"image": image, "sequences": {name: rects}}, f, indent=1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "pack":
+        for atlas_name, spec in PACK_SPECS.items():
+            print("wrote", build(atlas_name, spec))
+    elif len(sys.argv) == 7 and sys.argv[1] == "grid":
+        grid_meta(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5], sys.argv[6])
+        print("wrote", sys.argv[6])
+    else:
+        print("usage: python atlas.py pack | grid <sheet.png> <frame_w> <frame_h> <name> <out.json>")
+        sys.exit(1)
@@ -0,0 +1,182 @@
+# This file benchmarks the load, draw and collision hot paths
+#
+#   python bench.py                           # Demo.json + 10k/100k/1M tile levels
+#   python bench.py --sizes 10000 --out now.json --baseline before.json
+#
+# Runs headless. Every operation reports median and p95 in milliseconds per
+# call; results are written as JSON so runs can be compared. With --baseline
+# the run fails (exit code 1) when any median is more than --threshold slower.
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import statistics
+
+os.environ["RUN_RED_HEADLESS"] = "1"
+
+import pygame
+import Test
+import level_format
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+# ----------------------------
+# SYNTHETIC LEVELS
+# ----------------------------
+def synthetic_level(n_tiles, seed=0):
+    """A walkable level of exactly n_tiles records: ground, water gaps,
+    platforms, vines, power-ups and scenery, like the hand-built levels."""
+    rng = random.Random(seed)
+    records = []
+    x = 0
+    while len(records) < n_tiles:
+        if x > 8 and rng.random() < 0.04:
+            records.append((14, x, 14, 1.0))              # water
+        else:
+            records.append((62, x, 14, 1.0))              # ground
+            records.append((2, x, 15, 1.0))
+        roll = rng.random()
+        if roll < 0.25:
+            records.append((5, x, rng.randint(6, 11), 1.0))  # platform
+        elif roll < 0.30:
+            records.append((120, x, rng.randint(9, 12), 1.0))  # vine
+        elif roll < 0.32:
+            records.append((rng.choice((110, 113)), x, 13, 1.0))  # power-up
+        elif roll < 0.40:
+            records.append((rng.randint(94, 109), x, rng.randint(0, 12), round(rng.uniform(0.8, 2.5), 1)))
+        x += 1
+    return records[:n_tiles]
+
+
+# ----------------------------
+# MEASUREMENT
+# ----------------------------
+def measure(fn, repeat, inner=1):
+    """Per-call times in ms for `repeat` samples of `inner` calls each."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - t0) * 1000 / inner)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+    return {"median_ms": statistics.median(ordered), "p95_ms": p95, "samples": len(ordered)}
+
+
+def bench_level(name, data, repeat):
+    print(f"-- {name}")
+    results = {}
+
+    def record(op, samples):
+        results[op] = summarize(samples)
+        print(f"   {op:28s} median {results[op]['median_ms']:9.4f} ms   p95 {results[op]['p95_ms']:9.4f} ms")
+
+    load_repeat = max(3, repeat // 10) if len(data) < 200_000 else 3
+    record("World.process_data", measure(lambda: Test.World().process_data(data), load_repeat))
+
+    world = Test.World()
+    world.process_data(data)
+    view = Test.SCREEN_WIDTH + Test.SIDE_MARGIN
+    max_scroll = max(1, world.bounds.right - view)
+    rng = random.Random(1)
+    surf = pygame.Surface((view, Test.SCREEN_HEIGHT + Test.LOWER_MARGIN))
+
+    record("World.draw", measure(lambda: world.draw(surf, rng.uniform(0, max_scroll)), repeat))
+
+    streamed = Test.World()
+    streamed.stream(level_format.LevelSections.from_records(data))
+
+    def jump_view():
+        left = rng.uniform(0, max_scroll)
+        streamed.update_stream(left, left + view)
+    record("World.update_stream", measure(jump_view, repeat))
+    record("draw_background", measure(lambda: Test.draw_background(surf, rng.uniform(0, max_scroll)), repeat))
+
+    player = Test.Player(Test.PLAYER_IDLE_FRAMES, Test.PLAYER_RUN, Test.PLAYER_CLIMB, Test.PLAYER_JUMP,
+                         Test.PLAYER_TURN, 100, Test.BASELINE_Y, Test.PLAYER_FOOT_OFFSET)
+
+    def step_player():
+        Test.sim_clock.advance(Test.PHYSICS_STEP_MS)
+        player.move_and_animate(player.speed, world)
+        if player.x > world.bounds.right or player.y > world.bounds.bottom + Test.SCREEN_HEIGHT:
+            player.x, player.y, player.vel_y = 100.0, float(player.baseline_y), 0.0
+    record("Player.move_and_animate", measure(step_player, repeat, inner=50))
+
+    wolf = Test.Wolf(Test.WOLF_STAND_FRAMES, Test.WOLF_IDLE_FRAMES, target_x=17 * Test.TILE_SIZE,
+                     floor_y=14 * Test.TILE_SIZE, world=world)
+    record("Wolf._ground_y_at", measure(lambda: wolf._ground_y_at(rng.randint(0, world.bounds.right)), repeat, inner=50))
+    return results
+
+
+# ----------------------------
+# COMPARISON
+# ----------------------------
+def compare(results, baseline, threshold):
+    """Regressions as (level, op, baseline ms, current ms) where the median grew past threshold."""
+    failures = []
+    for level, ops in results["levels"].items():
+        for op, stats in ops.items():
+            before = baseline.get("levels", {}).get(level, {}).get(op)
+            if before and stats["median_ms"] > before["median_ms"] * (1 + threshold):
+                failures.append((level, op, before["median_ms"], stats["median_ms"]))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load, draw and collision hot paths.")
+    parser.add_argument("--level", default="Demo.json", help="hand-built level to include")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES),
+                        help="synthetic level sizes in tiles")
+    parser.add_argument("--repeat", type=int, default=200, help="samples per operation")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="allowed median slowdown vs baseline (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "levels": {},
+    }
+
+    level_path = Test.PROJECT_ROOT / "src" / "levels" / args.level
+    results["levels"][args.level] = bench_level(args.level, level_format.load(level_path), args.repeat)
+    for size in args.sizes:
+        name = f"synthetic_{size}"
+        results["levels"][name] = bench_level(name, synthetic_level(size), args.repeat)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.threshold)
+        for level, op, before, now in failures:
+            print(f"REGRESSION {level} {op}: {before:.4f} ms -> {now:.4f} ms")
+        if failures:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
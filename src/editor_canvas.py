@@ -0,0 +1,154 @@
+# This file renders the level editor's canvas from cached chunks
+#
+# Placed tiles are pre-rendered into fixed-width chunk surfaces that are only
+# re-rendered when a place or erase touches them; drawing the canvas is one
+# blit per visible chunk. Scaled tile images are shared per (tile, size) and
+# the grid is a pre-rendered overlay, so the cost of a frame no longer grows
+# with the number of tiles or columns.
+
+import bisect
+
+import pygame
+
+CHUNK_WIDTH = 1024
+CHUNK_MEMORY_CAP = 48 * 1024 * 1024     # bytes of rendered chunks kept resident
+
+
+class TileImages:
+    """Tile images scaled once per (tile index, pixel size) and shared."""
+    def __init__(self, img_list, tile_size):
+        self.img_list = img_list
+        self.tile_size = tile_size
+        self.scaled = {}
+
+    def size(self, scale):
+        return int(self.tile_size * scale)
+
+    def get(self, tile_index, scale):
+        size = self.size(scale)
+        key = (tile_index, size)
+        img = self.scaled.get(key)
+        if img is None:
+            img = self.scaled[key] = pygame.transform.scale(self.img_list[tile_index], (size, size))
+        return img
+
+
+class GridOverlay:
+    """The placement grid, pre-rendered and shifted by the scroll."""
+    def __init__(self, tile_size, rows, view_w, canvas_w, height, color):
+        self.tile_size = tile_size
+        # vertical lines scroll with the canvas; one spare column covers the shift
+        self.columns = pygame.Surface((view_w + tile_size, height + 1), pygame.SRCALPHA)
+        for x in range(0, view_w + tile_size, tile_size):
+            pygame.draw.line(self.columns, color, (x, 0), (x, height))
+        self.rows = pygame.Surface((canvas_w + 1, rows * tile_size + 1), pygame.SRCALPHA)
+        for r in range(rows + 1):
+            pygame.draw.line(self.rows, color, (0, r * tile_size), (canvas_w, r * tile_size))
+
+    def draw(self, surf, scroll):
+        surf.blit(self.columns, (-(scroll % self.tile_size), 0))
+        surf.blit(self.rows, (0, 0))
+
+
+class EditorCanvas:
+    """Placed tiles, bucketed by the chunks they overlap, drawn from chunk surfaces.
+
+    Tiles are (tile_index, x, y, scale) in grid cells, drawn by their order
+    number: the position given to set_tiles(), or the order passed to
+    place() / apply(), which default to placing on top.
+    """
+    def __init__(self, images, height, chunk_width=CHUNK_WIDTH, memory_cap=CHUNK_MEMORY_CAP):
+        self.images = images
+        self.tile_size = images.tile_size
+        self.height = height
+        self.chunk_width = chunk_width
+        self.memory_cap = memory_cap
+        self.chunk_bytes = chunk_width * height * 4
+        self.clear()
+
+    def clear(self):
+        self.tiles = {}         # chunk key -> [(order, tile), ...] overlapping it
+        self.surfaces = {}      # chunk key -> rendered surface
+        self.dirty = set()
+        self.count = 0
+        self.renders = 0
+
+    def _keys(self, tile):
+        tile_index, x, y, scale = tile
+        left = x * self.tile_size
+        right = left + max(1, self.images.size(scale))
+        return range(left // self.chunk_width, (right - 1) // self.chunk_width + 1)
+
+    def set_tiles(self, tiles):
+        self.clear()
+        for tile in tiles:
+            self.place(tile)
+
+    def place(self, tile, order=None):
+        if order is None:
+            order = self.count
+        entry = (order, tile)
+        for key in self._keys(tile):
+            entries = self.tiles.setdefault(key, [])
+            if entries and entries[-1][0] > order:
+                bisect.insort(entries, entry)
+            else:
+                entries.append(entry)
+            self.dirty.add(key)
+        self.count = max(self.count, order + 1)
+
+    def erase(self, tile):
+        """Remove every placed copy of `tile` from the chunks it covers."""
+        for key in self._keys(tile):
+            entries = self.tiles.get(key)
+            if entries:
+                kept = [e for e in entries if e[1] != tile]
+                if len(kept) != len(entries):
+                    self.tiles[key] = kept
+                    self.dirty.add(key)
+
+    def apply(self, removed, added):
+        """Erase tiles and place (order, tile) pairs; each touched chunk is filtered once."""
+        gone = {}
+        for tile in removed:
+            for key in self._keys(tile):
+                gone.setdefault(key, set()).add(tile)
+        for key, tiles in gone.items():
+            entries = self.tiles.get(key)
+            if entries:
+                self.tiles[key] = [e for e in entries if e[1] not in tiles]
+                self.dirty.add(key)
+        for order, tile in added:
+            self.place(tile, order)
+
+    def _render(self, key):
+        surf = self.surfaces.get(key)
+        if surf is None:
+            surf = self.surfaces[key] = pygame.Surface((self.chunk_width, self.height), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 0))
+        left = key * self.chunk_width
+        ts = self.tile_size
+        surf.blits([(self.images.get(t, s), (x * ts - left, y * ts)) for _, (t, x, y, s) in self.tiles.get(key, ())], False)
+        self.dirty.discard(key)
+        self.renders += 1
+        return surf
+
+    def draw(self, surf, scroll, view_w):
+        first = int(scroll // self.chunk_width)
+        last = int((scroll + view_w - 1) // self.chunk_width)
+        for key in range(first, last + 1):
+            if key not in self.tiles:
+                continue
+            chunk = self.surfaces.get(key)
+            if chunk is None or key in self.dirty:
+                chunk = self._render(key)
+            surf.blit(chunk, (key * self.chunk_width - scroll, 0))
+        self._evict(first, last)
+
+    def _evict(self, first, last):
+        center = (first + last) / 2
+        while len(self.surfaces) * self.chunk_bytes > self.memory_cap:
+            far = max(self.surfaces, key=lambda k: abs(k - center))
+            if first <= far <= last:
+                break
+            del self.surfaces[far]
@@ -0,0 +1,178 @@
+# This file keeps the level editor's unsaved work on disk without blocking frames
+#
+# Every command the editor applies is appended to <level>.journal as one
+# compact JSON line of [removed tiles, added (order, tile)s]. A background
+# thread owns all the files: it mirrors the placed tiles, appends journal
+# lines, and every AUTOSAVE_EDITS commands (or after AUTOSAVE_SECONDS without
+# edits) compacts the journal into a full snapshot, <level>.autosave, and
+# starts the journal over. Saving the level is done on the same thread from
+# its mirror, so the UI thread only ever queues work.
+#
+# The mirror uses the editor's model, every layered tile with its draw
+# order, and the snapshot keeps the orders too. Journal lines say which
+# tiles are absent and which are present at which order, so replaying them
+# on a snapshot that already contains them changes nothing; that makes a
+# crash between writing a snapshot and emptying the journal harmless.
+# recover() rebuilds the tiles from the snapshot plus the journal and
+# ignores a half-written last line. Lines are flushed whenever the queue
+# drains, which survives the editor crashing; they are only fsynced with
+# each snapshot.
+
+import os
+import json
+import queue
+import threading
+from pathlib import Path
+
+import level_format
+
+AUTOSAVE_EDITS = 200
+AUTOSAVE_SECONDS = 10.0
+
+
+def journal_path(level_path):
+    return Path(str(level_path) + ".journal")
+
+
+def autosave_path(level_path):
+    return Path(str(level_path) + ".autosave")
+
+
+def recover(level_path):
+    """Tiles (tile_index, x, y, scale) left unsaved by a previous session, or None."""
+    snapshot = autosave_path(level_path)
+    if not snapshot.is_file():
+        return None
+    with open(snapshot) as f:
+        order = {(t, x, y, s): n for n, t, x, y, s in json.load(f)}
+    log = journal_path(level_path)
+    if log.is_file():
+        with open(log) as f:
+            for line in f:
+                try:
+                    removed, placed = json.loads(line)
+                except ValueError:
+                    break       # torn write from the crash
+                _replay(order, removed, placed)
+    return sorted(order, key=order.get)
+
+
+def _replay(order, removed, placed):
+    for tile in removed:
+        order.pop(tuple(tile), None)
+    for n, *tile in placed:
+        order[tuple(tile)] = n
+
+
+def _replace(path, write):
+    """Write a file through a temporary sibling so readers never see half of it."""
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "w") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Journal:
+    def __init__(self, level_path, autosave_edits=AUTOSAVE_EDITS, autosave_seconds=AUTOSAVE_SECONDS):
+        self.level_path = Path(level_path)
+        self.journal_path = journal_path(level_path)
+        self.autosave_path = autosave_path(level_path)
+        self.autosave_edits = autosave_edits
+        self.autosave_seconds = autosave_seconds
+        self.queue = queue.Queue()
+
+        # owned by the writer thread
+        self.order = {}         # (tile_index, x, y, scale) -> draw order, mirrors the editor
+        self.file = None        # open journal, None until the snapshot it extends exists
+        self.edits = 0          # journal lines since the last snapshot
+
+        self.thread = threading.Thread(target=self._run, name="editor-journal", daemon=True)
+        self.thread.start()
+
+    # --- Called from the editor ---
+    def record(self, removed, added):
+        """Queue one command's removed tiles and added (order, tile)s (TileStore's on_change lists)."""
+        self.queue.put(("edit", removed, added))
+
+    def reset(self, tiles, saved=True):
+        """Start over from `tiles` in draw order, as a freshly loaded TileStore
+        numbers them; `saved` means they are exactly the level file on disk."""
+        self.queue.put(("reset", list(tiles), saved))
+
+    def save(self):
+        """Queue writing the level file; the journal and snapshot go once it is written."""
+        self.queue.put(("save",))
+
+    def wait(self):
+        self.queue.join()
+
+    def close(self):
+        """Snapshot any unsaved edits and stop the writer thread."""
+        self.queue.put(("close",))
+        self.thread.join()
+
+    # --- Writer thread ---
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.autosave_seconds if self.edits else None)
+            except queue.Empty:
+                self._safe(self._compact)
+                continue
+            if item[0] == "close":
+                if self.edits:
+                    self._safe(self._compact)
+                if self.file:
+                    self.file.close()
+                self.queue.task_done()
+                return
+            self._safe(getattr(self, "_" + item[0]), *item[1:])
+            if self.file and self.queue.empty():
+                self._safe(self.file.flush)
+            self.queue.task_done()
+
+    def _safe(self, fn, *args):
+        try:
+            fn(*args)
+        except OSError as e:
+            print("Journal error:", e)
+
+    def _edit(self, removed, added):
+        if self.file is None:
+            self._compact()     # the journal always extends a snapshot
+        line = [[list(tile) for tile in removed], [[n, *tile] for n, tile in added]]
+        _replay(self.order, *line)
+        self.file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.edits += 1
+        if self.edits >= self.autosave_edits:
+            self._compact()
+
+    def _compact(self):
+        tiles = [[n, *tile] for tile, n in self.order.items()]
+        _replace(self.autosave_path, lambda f: json.dump(tiles, f, separators=(",", ":")))
+        if self.file:
+            self.file.close()
+        self.file = open(self.journal_path, "w")
+        self.edits = 0
+
+    def _discard(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        self.edits = 0
+        for path in (self.journal_path, self.autosave_path):
+            path.unlink(missing_ok=True)
+
+    def _reset(self, tiles, saved):
+        self.order = {tuple(tile): n for n, tile in enumerate(tiles)}
+        if saved:
+            self._discard()
+        else:
+            self._compact()
+
+    def _save(self):
+        entries = level_format.to_entries(sorted(self.order, key=self.order.get))
+        _replace(self.level_path, lambda f: json.dump(entries, f, indent=4))  # indent makes it easier to edit manually
+        self._discard()
@@ -0,0 +1,201 @@
+# This file holds the level editor's placed tiles and its undo/redo history
+#
+# A cell can hold several layers (a water tile under a decoration, a solid
+# under a scaled prop), but never two identical (tile_index, scale) copies.
+# Every tile has a draw-order number; `order` maps each placed tile to it
+# and `cells` lists each cell's layers bottom to top, so placing and erasing
+# touch only the cell involved. Every edit is recorded as a command of
+# (tile, order before, order after) changes, None meaning absent; undo and
+# redo re-apply the before or after side, so each step costs as much as the
+# edit itself and a tile brought back by undo returns to its old depth.
+#
+# Region operations (rectangle fill/erase, flood fill, paste) build their
+# changes up front and apply them as a single command, so the canvas hears
+# about the whole region at once and one undo reverts it.
+
+from collections import deque
+
+import level_format
+
+
+class TileStore:
+    def __init__(self, on_change=None):
+        self.order = {}          # (tile_index, x, y, scale) -> draw order
+        self.cells = {}          # (x, y) -> [tile, ...] bottom to top
+        self.next_order = 0
+        self.undo_stack = []
+        self.redo_stack = []
+        self.on_change = on_change
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, cell):
+        return cell in self.cells
+
+    def get(self, x, y):
+        """(tile_index, scale) layers at a cell, bottom to top."""
+        return [(t, s) for t, _, _, s in self.cells.get((x, y), ())]
+
+    def tiles(self):
+        """(tile_index, x, y, scale) in draw order."""
+        return sorted(self.order, key=self.order.get)
+
+    # --- Editing ---
+    def place(self, tile_index, x, y, scale=1.0):
+        """Put a tile on top of a cell; a cell already holding it is left alone."""
+        return self.edit([(tile_index, x, y, scale)])
+
+    def erase(self, x, y):
+        """Remove every layer of a cell."""
+        return self.edit(removed=self.cells.get((x, y), ()))
+
+    def edit(self, added=(), removed=()):
+        """Remove then add tiles as one undoable command.
+
+        Added tiles go on top in the order given; tiles already placed stay
+        where they are. Returns the number of tiles that changed; a command
+        that changes nothing is not recorded.
+        """
+        changes = {}
+        for tile in removed:
+            if tile in self.order:
+                changes[tile] = (tile, self.order[tile], None)
+        for tile in added:
+            if tile in changes:
+                del changes[tile]           # removed and re-added: unchanged
+            elif tile not in self.order:
+                changes[tile] = (tile, None, self.next_order)
+                self.next_order += 1
+        changes = list(changes.values())
+        if changes:
+            self._apply(changes)
+            self.undo_stack.append(changes)
+            self.redo_stack = []
+        return len(changes)
+
+    def _apply(self, changes):
+        """Move every (tile, before, after) change to its after side.
+
+        on_change gets the removed tiles and the added (order, tile) pairs.
+        """
+        removed = []
+        added = []
+        order = self.order
+        cells = self.cells
+        for tile, before, after in changes:
+            cell = (tile[1], tile[2])
+            if before is not None:
+                del order[tile]
+                layers = cells[cell]
+                layers.remove(tile)
+                if not layers:
+                    del cells[cell]
+                removed.append(tile)
+            if after is not None:
+                order[tile] = after
+                layers = cells.setdefault(cell, [])
+                i = len(layers)
+                while i and order[layers[i - 1]] > after:
+                    i -= 1
+                layers.insert(i, tile)
+                added.append((after, tile))
+        if self.on_change:
+            self.on_change(removed, added)
+
+    # --- Regions ---
+    # Rectangles are two corner cells in any order, both included.
+    def fill_rect(self, x0, y0, x1, y1, tile_index, scale=1.0):
+        return self.edit([(tile_index, x, y, scale) for x, y in _rect_cells(x0, y0, x1, y1)])
+
+    def erase_rect(self, x0, y0, x1, y1):
+        cells = self.cells
+        return self.edit(removed=[tile for cell in _rect_cells(x0, y0, x1, y1) for tile in cells.get(cell, ())])
+
+    def flood_fill(self, x, y, tile_index, scale, bounds):
+        """Place a tile on the 4-connected area of cells whose layers match (x, y)'s.
+
+        An empty start cell fills the empty area around it. `bounds` is the
+        (x0, y0, x1, y1) rectangle the fill may spread into.
+        """
+        bx0, by0, bx1, by1 = bounds
+        if not (bx0 <= x <= bx1 and by0 <= y <= by1):
+            return 0
+        target = self.get(x, y)
+        if (tile_index, scale) in target:
+            return 0
+        seen = {(x, y)}
+        todo = deque(seen)
+        while todo:
+            cx, cy = todo.popleft()
+            for n in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+                if (n not in seen and bx0 <= n[0] <= bx1 and by0 <= n[1] <= by1
+                        and self.get(*n) == target):
+                    seen.add(n)
+                    todo.append(n)
+        return self.edit([(tile_index, cx, cy, scale) for cx, cy in seen])
+
+    def copy_rect(self, x0, y0, x1, y1):
+        """Every layer in a rectangle as (dx, dy, tile_index, scale) from its top-left, in draw order."""
+        left, top = min(x0, x1), min(y0, y1)
+        cells = self.cells
+        tiles = [tile for cell in _rect_cells(x0, y0, x1, y1) for tile in cells.get(cell, ())]
+        tiles.sort(key=self.order.get)
+        return [(x - left, y - top, t, s) for t, x, y, s in tiles]
+
+    def paste(self, clip, x, y, bounds):
+        """Place copied tiles with the clip's top-left at (x, y); empty cells are
+        left alone and tiles landing outside the `bounds` rectangle are dropped."""
+        bx0, by0, bx1, by1 = bounds
+        return self.edit([(t, x + dx, y + dy, s) for dx, dy, t, s in clip
+                          if bx0 <= x + dx <= bx1 and by0 <= y + dy <= by1])
+
+    # --- History ---
+    def undo(self):
+        if not self.undo_stack:
+            return False
+        changes = self.undo_stack.pop()
+        self._apply([(tile, after, before) for tile, before, after in changes])
+        self.redo_stack.append(changes)
+        return True
+
+    def redo(self):
+        if not self.redo_stack:
+            return False
+        changes = self.redo_stack.pop()
+        self._apply(changes)
+        self.undo_stack.append(changes)
+        return True
+
+    # --- Load / save ---
+    def load(self, data):
+        """Replace everything with a level (any format level_format reads); clears history.
+
+        Returns the number of tiles read. Exact duplicates are kept once, at
+        the last copy's depth, which is the one that was drawn on top; every
+        other layer is kept as it was.
+        """
+        order = {}
+        read = 0
+        for tile in level_format.iter_records(data):
+            order.pop(tile, None)
+            order[tile] = read
+            read += 1
+        self.order = {}
+        self.cells = {}
+        for i, tile in enumerate(order):
+            self.order[tile] = i
+            self.cells.setdefault((tile[1], tile[2]), []).append(tile)
+        self.next_order = len(self.order)
+        self.undo_stack = []
+        self.redo_stack = []
+        return read
+
+    def to_entries(self):
+        return level_format.to_entries(self.tiles())
+
+
+def _rect_cells(x0, y0, x1, y1):
+    for x in range(min(x0, x1), max(x0, x1) + 1):
+        for y in range(min(y0, y1), max(y0, y1) + 1):
+            yield x, y
@@ -0,0 +1,65 @@
+# This file runs a level without a display and prints a simulation summary
+#
+#   python headless.py --level Demo.json --frames 3000 --script inputs.json
+#   python headless.py --frames 600 --trace run.json   # Chrome trace of the run
+#   python headless.py --record run.rec                 # save input + state hashes
+#   python headless.py --replay run.rec                 # re-run it, exit 1 on divergence
+#
+# The script is a JSON list of [frame, [keys held from that frame on]] pairs,
+# with keys from Test.SCRIPT_KEYS ("a", "d", "w", "s", "space"). Without one
+# Red just holds right.
+
+import os
+import sys
+import json
+import argparse
+
+os.environ["RUN_RED_HEADLESS"] = "1"
+
+import Test
+import tracing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless, uncapped simulation of a level.")
+    parser.add_argument("--level", default="Demo.json")
+    parser.add_argument("--frames", type=int, default=3600)
+    parser.add_argument("--script", help="JSON input script of [frame, [keys]] pairs")
+    parser.add_argument("--trace", help="write a Chrome trace of the run to this file")
+    parser.add_argument("--record", help="record input and per-frame state hashes to this file")
+    parser.add_argument("--replay", help="replay a recording and check its state hashes")
+    args = parser.parse_args()
+
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    else:
+        script = [[0, ["d"]]]
+
+    level, frames = args.level, args.frames
+    if args.replay:
+        source = Test.ReplayInput.load(args.replay)
+        level, frames = source.level, source.frames
+    elif args.record:
+        source = Test.RecordingInput(Test.ScriptedInput(script), level, args.record)
+    else:
+        source = Test.ScriptedInput(script)
+
+    if args.trace:
+        tracing.start(args.trace)
+    summary = Test.main(level, headless=True, frames=frames, input_source=source)
+    print(json.dumps(summary, indent=2))
+    if args.trace:
+        print("wrote", tracing.stop())
+    if args.record:
+        print("recorded", len(source.timing), "frames to", args.record)
+    if args.replay:
+        if source.diverged_at is not None:
+            print(f"replay DIVERGED at frame {source.diverged_at}")
+            return 1
+        print(f"replay matched {source.checked} frames")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
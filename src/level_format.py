@@ -0,0 +1,438 @@
+# This file reads and writes levels, including the compact binary format (.rrl)
+#
+# Layout (little-endian):
+#   header  : magic "RRLV", version, record size, record count,
+#             level bounds in grid cells (min_x, min_y, max_x, max_y, half-open),
+#             section width in columns (version 2)
+#   sections: first section key, section count, widest tile in cells,
+#             (version 3) the tiles' pixel extent (left, top, right, bottom,
+#             int32) and lowest and highest tile_index (int16), then
+#             (first record, record count) per section         (version 2+)
+#   records : one fixed-width record per tile -> tile_index, x, y, scale * 1000
+#             all stored as int16; version 2+ sorts them by section
+#   order   : each record's position in the source level, uint32 (version 2+)
+#
+# Section k holds the tiles whose left column x satisfies x // section_cols == k,
+# so a streaming reader can map just the columns near the camera. Version 1
+# files (no sections, records in level order) and version 2 files (no
+# extent; it is worked out on open) are still read.
+#
+# Converters accept the editor's JSON list format, the legacy list formats
+# BG.py still loads ([tile_index, x, y, scale] and [x, y, tile_index]) and the
+# level_data.csv grid. Scale is quantized to 1/1000, picking the value that
+# keeps the pixel size the game computes (int(TILE_SIZE * scale)) unchanged.
+
+import sys
+import csv
+import json
+import math
+import mmap
+import struct
+from array import array
+from pathlib import Path
+
+MAGIC = b"RRLV"
+VERSION = 3
+HEADER = struct.Struct("<4sHHI4hI")
+RECORD = struct.Struct("<4h")
+SECTION_HEADER = struct.Struct("<iIH")
+EXTENT = struct.Struct("<4i2h")
+SECTION = struct.Struct("<II")
+SECTION_COLS = 32
+SCALE_UNIT = 1000
+MIN_SCALE = 0.1
+TILE_SIZE = 740 // 16          # must match Test.TILE_SIZE
+INT16_MIN, INT16_MAX = -32768, 32767
+LOAD_BATCH = 1000              # tiles between progress steps of the iter_* loaders
+
+
+class LevelData:
+    """A loaded level as parallel int16 columns; no per-tile objects."""
+    __slots__ = ("tile_index", "x", "y", "scale_q", "bounds")
+
+    def __init__(self, tile_index, x, y, scale_q, bounds):
+        self.tile_index = tile_index
+        self.x = x
+        self.y = y
+        self.scale_q = scale_q
+        self.bounds = bounds
+
+    def __len__(self):
+        return len(self.tile_index)
+
+    def __iter__(self):
+        for t, x, y, q in zip(self.tile_index, self.x, self.y, self.scale_q):
+            yield t, x, y, q / SCALE_UNIT
+
+
+class LevelSections:
+    """A level split into column sections, read one section at a time.
+
+    records(key) returns [(order, tile_index, x, y, scale), ...] for the tiles
+    whose left column falls in section `key`, where `order` is the tile's
+    position in the whole level. Built in memory from any level, or mapped
+    from a version 2+ .rrl file so only the sections asked for are decoded.
+    """
+    def __init__(self, section_cols, bounds, max_cells, sections, reader=None,
+                 extent=(0, 0, 0, 0), index_range=(0, -1)):
+        self.section_cols = section_cols
+        self.bounds = bounds            # grid cells, half-open
+        self.max_cells = max_cells      # widest tile, in columns
+        self.sections = sections        # key -> records, or key -> (start, count) with a reader
+        self.reader = reader
+        self.extent = extent            # pixels (left, top, right, bottom) over every record
+        self.index_range = index_range  # lowest and highest tile_index, None if unknown
+
+    @classmethod
+    def from_records(cls, data, section_cols=SECTION_COLS, tile_size=TILE_SIZE):
+        return run_steps(cls.iter_from_records(data, section_cols, tile_size))
+
+    @classmethod
+    def iter_from_records(cls, data, section_cols=SECTION_COLS, tile_size=TILE_SIZE, batch=LOAD_BATCH):
+        """from_records() as a generator: yields ("Indexing level", done, total)
+        every `batch` tiles and returns the LevelSections."""
+        total = len(data) if hasattr(data, "__len__") else 0
+        sections = {}
+        max_cells = 1
+        min_x = min_y = max_x = max_y = None
+        left = top = right = bottom = min_index = max_index = None
+        for order, (tile_index, x, y, scale) in enumerate(iter_records(data)):
+            if order % batch == 0 and order:
+                yield "Indexing level", order, total
+            size = pixel_size(scale, tile_size)
+            cells = max(1, math.ceil(size / tile_size))
+            sections.setdefault(int(x) // section_cols, []).append((order, tile_index, x, y, scale))
+            max_cells = max(max_cells, cells)
+            px = int(x * tile_size)
+            py = int(y * tile_size)
+            if min_x is None:
+                min_x, min_y, max_x, max_y = x, y, x + cells, y + cells
+                left, top, right, bottom = px, py, px + size, py + size
+                min_index = max_index = tile_index
+            else:
+                min_x = min(min_x, x)
+                min_y = min(min_y, y)
+                max_x = max(max_x, x + cells)
+                max_y = max(max_y, y + cells)
+                left = min(left, px)
+                top = min(top, py)
+                right = max(right, px + size)
+                bottom = max(bottom, py + size)
+                min_index = min(min_index, tile_index)
+                max_index = max(max_index, tile_index)
+        if min_x is None:
+            return cls(section_cols, (0, 0, 0, 0), max_cells, sections)
+        return cls(section_cols, (min_x, min_y, max_x, max_y), max_cells, sections,
+                   extent=(left, top, right, bottom), index_range=(min_index, max_index))
+
+    def keys(self):
+        return sorted(self.sections)
+
+    def key_range(self):
+        """(first, last) section keys covering the level's columns."""
+        return self.bounds[0] // self.section_cols, (self.bounds[2] - 1) // self.section_cols
+
+    def pixel_extent(self, tile_count=None, tile_size=TILE_SIZE):
+        """(left, top, right, bottom) in pixels of the tiles a game with
+        `tile_count` tile images draws, matching the rects it builds for them.
+
+        Only a level holding tile indices outside that range (or a version 2
+        file, which does not store its extent) is scanned.
+        """
+        if self.index_range is not None:
+            low, high = self.index_range
+            if low >= 0 and (tile_count is None or high < tile_count):
+                return self.extent
+        rects = []
+        for key in self.keys():
+            for _, tile_index, x, y, scale in self.records(key):
+                if 0 <= tile_index and (tile_count is None or tile_index < tile_count):
+                    size = pixel_size(scale, tile_size)
+                    px, py = int(x * tile_size), int(y * tile_size)
+                    rects.append((px, py, px + size, py + size))
+        if not rects:
+            return (0, 0, 0, 0)
+        return (min(r[0] for r in rects), min(r[1] for r in rects),
+                max(r[2] for r in rects), max(r[3] for r in rects))
+
+    def records(self, key):
+        section = self.sections.get(key)
+        if section is None or self.reader is None:
+            return section or []
+        return self.reader(*section)
+
+    def close(self):
+        self.reader = None
+
+
+# ----------------------------
+# RECORD NORMALIZATION
+# ----------------------------
+def iter_records(data):
+    """Yield (tile_index, x, y, scale) from any supported in-memory level."""
+    if isinstance(data, LevelData):
+        yield from data
+        return
+    for item in data:
+        if isinstance(item, dict):
+            yield item.get("tile_index", -1), item.get("x", 0), item.get("y", 0), item.get("scale", 1.0)
+        elif isinstance(item, (list, tuple)):
+            if len(item) == 4:
+                tile_index, x, y, scale = item
+                yield tile_index, x, y, scale
+            elif len(item) == 3:
+                x, y, tile_index = item
+                yield tile_index, x, y, 1.0
+
+
+def pixel_size(scale, tile_size=TILE_SIZE):
+    return int(tile_size * max(MIN_SCALE, scale))
+
+
+def quantize_scale(scale, tile_size=TILE_SIZE):
+    """Nearest scale * SCALE_UNIT that renders at the same pixel size as `scale`."""
+    target = pixel_size(scale, tile_size)
+    q = round(scale * SCALE_UNIT)
+    for step in range(SCALE_UNIT):
+        for cand in (q - step, q + step):
+            if pixel_size(cand / SCALE_UNIT, tile_size) == target:
+                return cand
+    raise ValueError(f"cannot quantize scale {scale!r}")
+
+
+def _check_int16(value, what):
+    if value != int(value) or not INT16_MIN <= value <= INT16_MAX:
+        raise ValueError(f"{what} {value!r} does not fit the binary level format")
+    return int(value)
+
+
+# ----------------------------
+# CONVERTERS
+# ----------------------------
+def from_entries(entries):
+    """Records from the JSON list format or the legacy list formats."""
+    return list(iter_records(entries))
+
+
+def from_csv(path):
+    """Records from a level_data.csv style grid (row = y, column = x, -1 = empty)."""
+    records = []
+    with open(path, newline="") as f:
+        for y, row in enumerate(csv.reader(f)):
+            for x, cell in enumerate(row):
+                cell = cell.strip()
+                if cell and int(cell) >= 0:
+                    records.append((int(cell), x, y, 1.0))
+    return records
+
+
+def to_entries(records):
+    """Records back to the editor's JSON list-of-dicts format."""
+    return [{"tile_index": t, "x": x, "y": y, "scale": scale} for t, x, y, scale in iter_records(records)]
+
+
+# ----------------------------
+# BINARY READ / WRITE
+# ----------------------------
+def pack(records, section_cols=SECTION_COLS):
+    level = LevelSections.from_records(records, section_cols)
+    count = sum(len(level.sections[k]) for k in level.keys())
+    out = bytearray(HEADER.pack(MAGIC, VERSION, RECORD.size, count,
+                                *(_check_int16(b, "bound") for b in level.bounds), section_cols))
+    first, last = level.key_range() if count else (0, -1)
+    out += SECTION_HEADER.pack(first, last - first + 1, level.max_cells)
+    out += EXTENT.pack(*level.extent, *(_check_int16(i, "tile_index") for i in level.index_range))
+    start = 0
+    for key in range(first, last + 1):
+        n = len(level.sections.get(key, ()))
+        out += SECTION.pack(start, n)
+        start += n
+    orders = array("I")
+    for key in range(first, last + 1):
+        for order, tile_index, x, y, scale in level.sections.get(key, ()):
+            out += RECORD.pack(_check_int16(tile_index, "tile_index"), _check_int16(x, "x"),
+                               _check_int16(y, "y"), _check_int16(quantize_scale(scale), "scale"))
+            orders.append(order)
+    if sys.byteorder == "big":
+        orders.byteswap()
+    out += orders.tobytes()
+    return bytes(out)
+
+
+def write_binary(path, records):
+    Path(path).write_bytes(pack(records))
+
+
+def _read_header(mm, path):
+    magic, version, record_size, count, *rest = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version not in (1, 2, 3) or record_size != RECORD.size:
+        raise ValueError(f"{path} is not a version 1 to {VERSION} binary level")
+    records_at = HEADER.size
+    table = None
+    if version >= 2:
+        first, n_sections, max_cells = SECTION_HEADER.unpack_from(mm, HEADER.size)
+        sections_at = HEADER.size + SECTION_HEADER.size
+        extent = None
+        if version >= 3:
+            extent = EXTENT.unpack_from(mm, sections_at)
+            sections_at += EXTENT.size
+        records_at = sections_at + n_sections * SECTION.size
+        table = (first, n_sections, max_cells, sections_at, extent)
+    end = records_at + count * RECORD.size + (count * 4 if version >= 2 else 0)
+    if len(mm) < end:
+        raise ValueError(f"{path} is truncated")
+    return version, count, tuple(rest[:4]), rest[4], records_at, table
+
+
+def _int_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def read_binary(path):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        version, count, bounds, _, records_at, _ = _read_header(mm, path)
+        end = records_at + count * RECORD.size
+        cols = _int_array("h", mm[records_at:end])
+        orders = _int_array("I", mm[end:end + count * 4]) if version >= 2 else None
+    if orders is not None:
+        # back to level order so draw and collision order match the source
+        unsorted = cols
+        cols = array("h", bytes(len(unsorted) * 2))
+        for i, order in enumerate(orders):
+            cols[order * 4:order * 4 + 4] = unsorted[i * 4:i * 4 + 4]
+    return LevelData(cols[0::4], cols[1::4], cols[2::4], cols[3::4], bounds)
+
+
+def read_sections(path):
+    """LevelSections backed by a memory-mapped version 2+ .rrl file."""
+    f = open(path, "rb")
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+    version, count, bounds, section_cols, records_at, table = _read_header(mm, path)
+    if version == 1:
+        mm.close()
+        return LevelSections.from_records(read_binary(path))
+    first, n_sections, max_cells, sections_at, extent = table
+    orders_at = records_at + count * RECORD.size
+    sections = {}
+    for i in range(n_sections):
+        start, n = SECTION.unpack_from(mm, sections_at + i * SECTION.size)
+        if n:
+            sections[first + i] = (start, n)
+
+    def reader(start, n):
+        cols = _int_array("h", mm[records_at + start * RECORD.size:records_at + (start + n) * RECORD.size])
+        orders = _int_array("I", mm[orders_at + start * 4:orders_at + (start + n) * 4])
+        return [(orders[i], cols[4 * i], cols[4 * i + 1], cols[4 * i + 2], cols[4 * i + 3] / SCALE_UNIT)
+                for i in range(n)]
+
+    level = LevelSections(section_cols, bounds, max_cells, sections, reader)
+    if extent is not None:
+        level.extent, level.index_range = extent[:4], extent[4:]
+    elif count:
+        level.index_range = None
+    level.close = mm.close
+    return level
+
+
+def open_sections(path, section_cols=SECTION_COLS):
+    """A level for streaming: mapped from a .rrl file, otherwise loaded and indexed in memory."""
+    path = Path(path)
+    if path.suffix == ".rrl":
+        return read_sections(path)
+    return LevelSections.from_records(load(path), section_cols)
+
+
+def iter_open_sections(path, section_cols=SECTION_COLS, batch=LOAD_BATCH):
+    """open_sections() as a generator for loading screens.
+
+    Yields (stage, done, total) every `batch` tiles and returns the
+    LevelSections; a mapped .rrl file needs no steps at all.
+    """
+    path = Path(path)
+    if path.suffix == ".rrl":
+        return read_sections(path)
+    data = yield from iter_load(path, batch)
+    return (yield from LevelSections.iter_from_records(data, section_cols, batch=batch))
+
+
+def load(path):
+    """Load a level by extension: .rrl binary, .csv grid, anything else JSON."""
+    path = Path(path)
+    if path.suffix == ".rrl":
+        return read_binary(path)
+    if path.suffix == ".csv":
+        return from_csv(path)
+    with open(path) as f:
+        return json.load(f)
+
+
+def iter_load(path, batch=LOAD_BATCH):
+    """load() as a generator: yields ("Reading level", bytes done, bytes total).
+
+    A JSON list is decoded one tile at a time, so a large level can be read
+    a slice at a time instead of in one json.load call.
+    """
+    path = Path(path)
+    if path.suffix in (".rrl", ".csv"):
+        return load(path)
+    text = path.read_text()
+    skip = json.decoder.WHITESPACE.match
+    i = skip(text, 0).end()
+    if not text.startswith("[", i):
+        return json.loads(text)
+    decoder = json.JSONDecoder()
+    items = []
+    i = skip(text, i + 1).end()
+    while not text.startswith("]", i):
+        item, i = decoder.raw_decode(text, i)
+        items.append(item)
+        i = skip(text, i).end()
+        if text.startswith("]", i):
+            break
+        if not text.startswith(",", i):
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, i)
+        i = skip(text, i + 1).end()
+        if text.startswith("]", i):
+            raise json.JSONDecodeError("Expecting value", text, i)
+        if len(items) % batch == 0:
+            yield "Reading level", i, len(text)
+    # like json.load, anything after the list means the file is corrupt
+    end = skip(text, i + 1).end()
+    if end != len(text):
+        raise json.JSONDecodeError("Extra data", text, end)
+    return items
+
+
+def run_steps(steps):
+    """Run one of the iter_* loaders to the end without pausing; returns its result."""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def convert(src, dst):
+    """Convert between level files; the output format follows dst's extension."""
+    data = load(src)
+    dst = Path(dst)
+    if dst.suffix == ".rrl":
+        write_binary(dst, data)
+    else:
+        with open(dst, "w") as f:
+            json.dump(to_entries(data), f, indent=4)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python level_format.py <level.json|level.csv|level.rrl> [output]")
+        sys.exit(1)
+    src = Path(sys.argv[1])
+    dst = Path(sys.argv[2]) if len(sys.argv) == 3 else src.with_suffix(".rrl")
+    convert(src, dst)
+    print(f"{src} ({src.stat().st_size} bytes) -> {dst} ({dst.stat().st_size} bytes)")
@@ -1,10 +1,16 @@
 # This is the main that loads the menu and final game 
 
+import time
+START_TIME = time.perf_counter()
+
 import sys
 import pygame
 from pathlib import Path
 import importlib
-import Test
+import text_cache
+import asset_loader
+import animation
+import atlas
 
 
 # ----------------------------
@@ -33,11 +39,38 @@ clock = pygame.time.Clock()
 FONT_PATH = ASSETS_ROOT / "fonts" / "Enchanted Land.otf"
 
 def _font(sz, bold=False):
-    return pygame.font.Font(str(FONT_PATH), sz)
+    return text_cache.get_font(str(FONT_PATH), sz, bold)
 
 TITLE = _font(64)
 BTN = _font(36)
 
+# ----------------------------
+# LOADING SCREEN
+# ----------------------------
+def draw_loading(done, total):
+    surf = pygame.display.get_surface()
+    w, h = surf.get_size()
+    bar = pygame.Rect(0, 0, w // 2, 24)
+    bar.center = (w // 2, h // 2)
+    surf.fill(MENU_BG)
+    label = text_cache.render_font(BTN, "Loading...", (230, 230, 230))
+    surf.blit(label, label.get_rect(midbottom=(bar.centerx, bar.top - 12)))
+    pygame.draw.rect(surf, (60, 60, 60), bar, border_radius=12)
+    if total:
+        fill = bar.copy()
+        fill.width = bar.width * done // total
+        pygame.draw.rect(surf, (180, 180, 180), fill, border_radius=12)
+    pygame.draw.rect(surf, (180, 180, 180), bar, width=2, border_radius=12)
+    pygame.display.flip()
+    pygame.event.pump()
+
+# Test loads the game's assets when imported; show their progress meanwhile.
+# It opens its own window, so restore the menu's afterwards.
+asset_loader.set_progress_hook(draw_loading)
+import Test
+asset_loader.set_progress_hook(None)
+screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
+
 # ----------------------------
 # UI ELEMENTS
 # ----------------------------
@@ -47,7 +80,7 @@ def draw_button(surf, rect, text, mouse_pos):
     border = (180, 180, 180)
     pygame.draw.rect(surf, base, rect, border_radius=12)
     pygame.draw.rect(surf, border, rect, width=2, border_radius=12)
-    label = BTN.render(text, True, (230, 230, 230))
+    label = text_cache.render_font(BTN, text, (230, 230, 230))
     surf.blit(label, label.get_rect(center=rect.center))
 
 # ----------------------------
@@ -66,13 +99,7 @@ def load_frames(prefix, start, end, scale=2.0):
     for i in range(start, end + 1):
         p = ASSETS_ROOT / f"{prefix}{i}.png"
         try:
-            img = pygame.image.load(str(p)).convert_alpha()
-            if scale != 1.0:
-                img = pygame.transform.scale(
-                    img,
-                    (int(img.get_width() * scale), int(img.get_height() * scale)),
-                )
-            frames.append(img)
+            frames.append(asset_loader.image(p, scale))
         except Exception:
             frames.append(_placeholder(int(32 * scale), int(32 * scale), f"{prefix}{i}"))
     return frames if frames else [_placeholder(64, 64, "no_frames")]
@@ -89,17 +116,26 @@ class PlayerMenu(pygame.sprite.Sprite):
         self.x, self.y = float(self.rect.centerx), float(self.rect.bottom)
 
     def update(self):
+        """Advance the animation; True when the frame changed."""
         if not self.frames:
-            return
+            return False
         now = pygame.time.get_ticks()
         if now - self.last >= self.step:
             self.last = now
             self.idx = (self.idx + 1) % len(self.frames)
             self.image = self.frames[self.idx]
             self.rect = self.image.get_rect(midbottom=(int(self.x), int(self.y)))
+            return True
+        return False
+
+    def next_frame_in(self):
+        """Milliseconds until the next frame change, or None when it never changes."""
+        if len(self.frames) < 2:
+            return None
+        return max(0, self.step - (pygame.time.get_ticks() - self.last))
 
     def draw(self, surf):
-        surf.blit(self.image, self.rect)
+        surf.blit(animation.store.image(self.image), self.rect)
 
 # ----------------------------
 # AUDIO
@@ -132,64 +168,104 @@ def load_level(level_name):
 # ----------------------------
 # MAIN MENU
 # ----------------------------
+# Redraw only the regions that changed and sleep until the next animation
+# frame or input event; False repaints the whole screen at FPS as before
+MENU_DIRTY_RECTS = True
+LEVELS = ["Demo", "Tutorial", "Level1"]
+
+def _button_rect(row):
+    rect = pygame.Rect(0, 0, 240, 56)
+    rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + row * 80)
+    return rect
+
+def _wait_events(timeout):
+    """Block until an event arrives or `timeout` ms pass (None waits for input only)."""
+    if timeout is None or timeout > 0:
+        e = pygame.event.wait() if timeout is None else pygame.event.wait(timeout)
+        if e.type == pygame.NOEVENT:
+            return []
+        return [e] + pygame.event.get()
+    return pygame.event.get()
+
 def main():
+    screen = pygame.display.get_surface()
     title = TITLE.render("Run Red, Run!", True, (230, 230, 230))
     
-    # Buttons on main menu
-    level_rect = pygame.Rect(0, 0, 240, 56)
-    level_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3)
-    
-    exit_rect = pygame.Rect(0, 0, 240, 56)
-    exit_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + 80)
+    # Buttons on main menu and level select (label, rect, level or None)
+    main_buttons = [("Level Select", _button_rect(0), None), ("Exit", _button_rect(1), None)]
+    level_buttons = [(lvl, _button_rect(i), lvl) for i, lvl in enumerate(LEVELS)]
     
     # Player sprite in menu
-    idle = load_frames("red_idle_", 1, 8, scale=2.8)
+    red_atlas = atlas.load(atlas.ATLAS_ROOT / "red.json", 2.8)
+    idle = animation.store.add("menu_red_idle", atlas.frames_or(red_atlas, "red_idle", lambda: load_frames("red_idle_", 1, 8, scale=2.8)))
     menu_red = PlayerMenu(idle, x=SCREEN_WIDTH // 2, baseline_y=SCREEN_HEIGHT // 2 + 220)
     
     play_menu_music()
     
+    def draw_scene(buttons, mp):
+        screen.fill(MENU_BG)
+        screen.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 6)))
+        for label, rect, _ in buttons:
+            draw_button(screen, rect, label, mp)
+        menu_red.draw(screen)
+    
     in_level_select = False
+    hovered = None
+    full_redraw = True
+    first_frame = True
     running = True
     while running:
-        mp = pygame.mouse.get_pos()
-        for e in pygame.event.get():
+        if MENU_DIRTY_RECTS and not full_redraw:
+            events = _wait_events(menu_red.next_frame_in())
+        else:
+            events = pygame.event.get()
+        buttons = level_buttons if in_level_select else main_buttons
+        for e in events:
             if e.type == pygame.QUIT:
                 running = False
+            elif e.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESIZED):
+                full_redraw = True
             elif e.type == pygame.MOUSEBUTTONDOWN and e.button == 1:
-                if not in_level_select:
-                    # Main menu clicks
-                    if level_rect.collidepoint(e.pos):
-                        in_level_select = True
-                    elif exit_rect.collidepoint(e.pos):
-                        running = False
-                else:
-                    # Level select clicks
-                    levels = ["Demo", "Tutorial", "Level1"]
-                    for i, lvl in enumerate(levels):
-                        lvl_rect = pygame.Rect(0, 0, 240, 56)
-                        lvl_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + i * 80)
-                        if lvl_rect.collidepoint(e.pos):
-                            pygame.mixer.music.stop()
-                            load_level(lvl)
-                            play_menu_music()
-                            in_level_select = False
+                clicked = next((b for b in buttons if b[1].collidepoint(e.pos)), None)
+                if clicked is None:
+                    continue
+                label, _, lvl = clicked
+                if lvl is not None:
+                    pygame.mixer.music.stop()
+                    load_level(lvl)
+                    play_menu_music()
+                    in_level_select = False
+                    screen = pygame.display.get_surface()
+                elif label == "Level Select":
+                    in_level_select = True
+                elif label == "Exit":
+                    running = False
+                full_redraw = True
+                buttons = level_buttons if in_level_select else main_buttons
         
-        screen.fill(MENU_BG)
-        screen.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 6)))
-        
-        if not in_level_select:
-            draw_button(screen, level_rect, "Level Select", mp)
-            draw_button(screen, exit_rect, "Exit", mp)
-        else:
-            levels = ["Demo", "Tutorial", "Level1"]
-            for i, lvl in enumerate(levels):
-                lvl_rect = pygame.Rect(0, 0, 240, 56)
-                lvl_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + i * 80)
-                draw_button(screen, lvl_rect, lvl, mp)
+        mp = pygame.mouse.get_pos()
+        dirty = []
+        hover = next((rect for _, rect, _ in buttons if rect.collidepoint(mp)), None)
+        if hover != hovered:
+            dirty += [r for r in (hovered, hover) if r is not None]
+            hovered = hover
+        old_rect = menu_red.rect.copy()
+        if menu_red.update():
+            dirty += [old_rect, menu_red.rect.copy()]
         
-        menu_red.update()
-        menu_red.draw(screen)
-        pygame.display.flip()
+        if full_redraw or not MENU_DIRTY_RECTS:
+            draw_scene(buttons, mp)
+            pygame.display.flip()
+            full_redraw = False
+        elif dirty:
+            for rect in dirty:
+                screen.set_clip(rect)
+                draw_scene(buttons, mp)
+            screen.set_clip(None)
+            pygame.display.update(dirty)
+        if first_frame:
+            first_frame = False
+            print(f"Menu ready in {time.perf_counter() - START_TIME:.2f}s")
         clock.tick(FPS)
 
     pygame.quit()
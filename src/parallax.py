@@ -0,0 +1,79 @@
+# This file draws the scrolling parallax background
+#
+# Each layer is one image repeated every `spacing` pixels along x, moving at
+# `factor` times the camera scroll. Only the repeats that overlap the view
+# are blitted, so a layer costs two or three blits however long the level is.
+#
+# With strips=True each layer is also pre-composited into a strip a little
+# wider than the view and redrawn only when the scroll moves past its ends,
+# one blit per layer per frame. Repeats are copied into the strip (not
+# alpha-blended twice), so layers whose repeats overlap are always drawn
+# directly. Blit positions inside a strip are whole pixels, so a strip can
+# land one pixel away from a direct draw.
+
+import math
+
+import pygame
+
+
+class ParallaxLayer:
+    def __init__(self, image, factor, y, spacing=None, repeats=None):
+        self.image = image
+        self.factor = factor
+        self.y = y
+        self.spacing = spacing or image.get_width()
+        self.repeats = repeats      # None repeats forever
+        self.strip = None
+        self.strip_first = 0
+        self.strip_count = 0
+
+    def visible(self, scroll, view_w):
+        """Range of repeat indexes that overlap [0, view_w) at this scroll."""
+        shift = scroll * self.factor
+        first = max(0, math.floor((shift - self.image.get_width()) / self.spacing) + 1)
+        last = math.floor((shift + view_w) / self.spacing)
+        if self.repeats is not None:
+            last = min(last, self.repeats - 1)
+        return range(first, last + 1)
+
+    def draw(self, surf, scroll):
+        shift = scroll * self.factor
+        for i in self.visible(scroll, surf.get_width()):
+            surf.blit(self.image, (i * self.spacing - shift, self.y))
+
+    def draw_strip(self, surf, scroll):
+        if self.spacing < self.image.get_width():
+            return self.draw(surf, scroll)
+        visible = self.visible(scroll, surf.get_width())
+        if not visible:
+            return
+        if (self.strip is None or visible.start < self.strip_first
+                or visible.stop > self.strip_first + self.strip_count):
+            self._build_strip(visible.start, surf.get_width())
+        surf.blit(self.strip, (self.strip_first * self.spacing - scroll * self.factor, self.y))
+
+    def _build_strip(self, first, view_w):
+        count = math.ceil(view_w / self.spacing) + 2
+        if self.repeats is not None:
+            count = max(1, min(count, self.repeats - first))
+        width = (count - 1) * self.spacing + self.image.get_width()
+        if self.strip is None or self.strip.get_width() != width:
+            self.strip = pygame.Surface((width, self.image.get_height()), pygame.SRCALPHA)
+        self.strip.fill((0, 0, 0, 0))
+        for i in range(count):
+            self.strip.blit(self.image, (i * self.spacing, 0), special_flags=pygame.BLEND_RGBA_ADD)
+        self.strip_first = first
+        self.strip_count = count
+
+
+class ParallaxBackground:
+    def __init__(self, layers, strips=False):
+        self.layers = layers
+        self.strips = strips
+
+    def draw(self, surf, scroll):
+        for layer in self.layers:
+            if self.strips:
+                layer.draw_strip(surf, scroll)
+            else:
+                layer.draw(surf, scroll)
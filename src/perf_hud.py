@@ -0,0 +1,129 @@
+# This file draws the in-game performance overlay (toggle with F3)
+#
+# The game loop calls begin_frame() once per frame and mark(phase) after each
+# phase; the time since the previous mark is charged to that phase. Samples
+# go into fixed-size ring buffers covering the last few seconds. The panel
+# itself (text and frame-time graph) is only re-rendered a few times a second
+# and blitted in between, so leaving it on costs well under 0.1 ms a frame.
+
+import os
+import time
+from array import array
+
+import pygame
+
+PHASES = ("events", "physics", "bg", "world", "hud", "present")
+HUD_SECONDS = 5
+HUD_REFRESH_MS = 250
+GRAPH_W, GRAPH_H = 240, 60
+GRAPH_MAX_MS = 50.0
+PANEL_BG = (0, 0, 0, 170)
+TEXT_COLOR = (230, 230, 230)
+BUDGET_COLOR = (90, 200, 90)
+SPIKE_COLOR = (230, 80, 80)
+
+
+class PerfHUD:
+    def __init__(self, fps=60, seconds=HUD_SECONDS, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get("RUN_RED_PERF_HUD") == "1"
+        self.enabled = enabled
+        self.fps = fps
+        self.size = fps * seconds
+        self.frame_ms = array("d", bytes(8 * self.size))
+        self.phase_ms = {phase: array("d", bytes(8 * self.size)) for phase in PHASES}
+        self.index = 0
+        self.count = 0
+        self.frame_start = None
+        self.last_mark = 0.0
+        self.panel = None
+        self.next_refresh = 0.0
+        self.font = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frame_start = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_ms[self.index] = (now - self.frame_start) * 1000
+            self.index = (self.index + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+        for samples in self.phase_ms.values():
+            samples[self.index] = 0.0
+        self.frame_start = self.last_mark = now
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phase_ms[phase][self.index] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def recent(self, samples):
+        """The last `count` completed samples, oldest first."""
+        n = self.count
+        start = (self.index - n) % self.size
+        if start + n <= self.size:
+            return samples[start:start + n]
+        return samples[start:] + samples[:self.index]
+
+    def stats(self):
+        frames = sorted(self.recent(self.frame_ms))
+        if not frames:
+            return None
+        mean = sum(frames) / len(frames)
+        stats = {
+            "frame_ms": mean,
+            "fps": 1000 / mean if mean else 0.0,
+            "p99_ms": frames[min(len(frames) - 1, int(len(frames) * 0.99))],
+            "max_ms": frames[-1],
+        }
+        for phase, samples in self.phase_ms.items():
+            recent = self.recent(samples)
+            stats[phase] = sum(recent) / len(recent)
+        return stats
+
+    def draw(self, surf, pos=(10, 10)):
+        if not self.enabled:
+            return
+        now = time.perf_counter() * 1000
+        if self.panel is None or now >= self.next_refresh:
+            self.panel = self._render_panel()
+            self.next_refresh = now + HUD_REFRESH_MS
+        if self.panel is not None:
+            surf.blit(self.panel, pos)
+
+    def _render_panel(self):
+        stats = self.stats()
+        if stats is None:
+            return None
+        if self.font is None:
+            self.font = pygame.font.SysFont("consolas", 16)
+        lines = [
+            f"{stats['frame_ms']:6.2f} ms  {stats['fps']:5.1f} fps",
+            f"p99 {stats['p99_ms']:6.2f} ms  max {stats['max_ms']:6.2f} ms",
+        ] + [f"{phase:8s}{stats[phase]:6.2f} ms" for phase in PHASES]
+        line_h = self.font.get_linesize()
+        panel = pygame.Surface((GRAPH_W + 12, len(lines) * line_h + GRAPH_H + 14), pygame.SRCALPHA)
+        panel.fill(PANEL_BG)
+        for i, line in enumerate(lines):
+            panel.blit(self.font.render(line, True, TEXT_COLOR), (6, 4 + i * line_h))
+
+        # Frame-time graph, newest on the right; the green line is the frame budget
+        top = len(lines) * line_h + 8
+        bottom = top + GRAPH_H
+        budget = 1000 / self.fps
+        budget_y = bottom - int(min(budget, GRAPH_MAX_MS) / GRAPH_MAX_MS * GRAPH_H)
+        pygame.draw.line(panel, BUDGET_COLOR, (6, budget_y), (6 + GRAPH_W, budget_y))
+        frames = self.recent(self.frame_ms)[-GRAPH_W:]
+        x0 = 6 + GRAPH_W - len(frames)
+        for i, ms in enumerate(frames):
+            h = int(min(ms, GRAPH_MAX_MS) / GRAPH_MAX_MS * GRAPH_H)
+            color = SPIKE_COLOR if ms > budget * 1.5 else TEXT_COLOR
+            pygame.draw.line(panel, color, (x0 + i, bottom), (x0 + i, bottom - h))
+        return panel
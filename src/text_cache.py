@@ -0,0 +1,36 @@
+# This file keeps loaded fonts and rendered text surfaces around between frames
+#
+# Fonts are loaded once per (face, size, bold). Rendered surfaces are kept in
+# an LRU keyed by font, string, color and antialias, so HUD text that only
+# changes once a second costs a blit instead of a rasterization. Returned
+# surfaces are shared: blit them, never draw on them.
+
+import functools
+from pathlib import Path
+
+import pygame
+
+TEXT_CACHE_SIZE = 256
+FONT_FILE_SUFFIXES = (".ttf", ".otf")
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(face, size, bold=False):
+    """`face` is a system font name, a font file path, or None for the default font."""
+    if face is not None and Path(face).suffix.lower() in FONT_FILE_SUFFIXES:
+        return pygame.font.Font(str(face), size)
+    return pygame.font.SysFont(face, size, bold=bold)
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_font(font, text, color, antialias=True):
+    return font.render(text, antialias, color)
+
+
+def render(text, color, face="arial", size=24, bold=False, antialias=True):
+    return render_font(get_font(face, size, bold), text, color, antialias)
+
+
+def clear():
+    render_font.cache_clear()
+    get_font.cache_clear()
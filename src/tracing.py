@@ -0,0 +1,141 @@
+# This file records timed spans and writes them as a Chrome trace
+#
+#   RUN_RED_TRACE=1 python main.py            # traces/trace_<time>.json
+#   RUN_RED_TRACE=run.json python headless.py
+#
+# Open the file in https://ui.perfetto.dev (or chrome://tracing). Spans come
+# from the @traced decorator and the span() context manager; the game loop
+# calls frame() once per frame so every frame shows up as its own slice with
+# the work it did nested underneath.
+#
+# When tracing is off, span() hands back one shared no-op context manager and
+# @traced adds a single flag check per call.
+
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+from pathlib import Path
+
+TRACE_DIR = Path(__file__).resolve().parent.parent / "traces"
+
+_enabled = False
+_path = None
+_events = []
+_t0 = time.perf_counter_ns()
+_frame_start = None
+_frame_number = 0
+
+
+def _now_us():
+    return (time.perf_counter_ns() - _t0) / 1000
+
+
+def enabled():
+    return _enabled
+
+
+def start(path=None):
+    """Start recording; the trace is written to `path` by stop() or at exit."""
+    global _enabled, _path
+    _path = Path(path) if path else TRACE_DIR / time.strftime("trace_%Y%m%d_%H%M%S.json")
+    _enabled = True
+
+
+def stop():
+    """Stop recording and write the trace file; returns its path (None if not tracing)."""
+    global _enabled, _frame_start
+    if not _enabled:
+        return None
+    if _frame_start is not None:
+        _complete(f"frame {_frame_number}", "frame", _frame_start, _now_us(), {"frame": _frame_number})
+        _frame_start = None
+    _enabled = False
+    _path.parent.mkdir(parents=True, exist_ok=True)
+    with open(_path, "w") as f:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms"}, f)
+    _events.clear()
+    return _path
+
+
+def _complete(name, cat, begin_us, end_us, args=None):
+    event = {"name": name, "cat": cat, "ph": "X", "ts": begin_us, "dur": end_us - begin_us,
+             "pid": os.getpid(), "tid": threading.get_ident()}
+    if args:
+        event["args"] = args
+    _events.append(event)
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "begin")
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.begin = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        _complete(self.name, self.cat, self.begin, _now_us(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, cat="game", **args):
+    """Context manager timing the enclosed block."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def traced(name=None, cat="game"):
+    """Decorator timing every call of the function."""
+    def wrap(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            begin = _now_us()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _complete(label, cat, begin, _now_us())
+        return inner
+    return wrap
+
+
+def frame(number):
+    """Close the previous frame's slice and open the next one."""
+    global _frame_start, _frame_number
+    if not _enabled:
+        return
+    now = _now_us()
+    if _frame_start is not None:
+        _complete(f"frame {_frame_number}", "frame", _frame_start, now, {"frame": _frame_number})
+    _frame_start = now
+    _frame_number = number
+
+
+_env = os.environ.get("RUN_RED_TRACE")
+if _env:
+    start(None if _env == "1" else _env)
+    atexit.register(stop)
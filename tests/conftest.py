@@ -0,0 +1,6 @@
+# This file lets the tests import the game's flat modules from src/
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
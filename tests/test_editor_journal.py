@@ -0,0 +1,146 @@
+# This file checks that the editor journal recovers exactly what the editor held
+#
+# No pygame: a TileStore feeds its on_change lists straight into a Journal,
+# the way BG.py wires them, and recover() is compared with store.tiles().
+
+import json
+import random
+import shutil
+from pathlib import Path
+
+import editor_journal
+import level_format
+from editor_journal import Journal
+from editor_store import TileStore
+
+LEVELS = Path(__file__).resolve().parent.parent / "src" / "levels"
+BOUNDS = (0, 0, 15, 9)
+
+
+def random_edits(store, rng, n):
+    for _ in range(n):
+        x, y = rng.randint(0, 15), rng.randint(0, 9)
+        t, s = rng.randint(0, 5), rng.choice((1.0, 1.0, 2.0))
+        op = rng.random()
+        if op < 0.4:
+            store.place(t, x, y, s)
+        elif op < 0.5:
+            store.erase(x, y)
+        elif op < 0.6:
+            store.fill_rect(x, y, x + rng.randint(0, 3), y + rng.randint(0, 3), t, s)
+        elif op < 0.65:
+            store.flood_fill(x, y, t, s, BOUNDS)
+        elif op < 0.8:
+            store.undo()
+        else:
+            store.redo()
+
+
+def open_store(level, rng, **journal_args):
+    journal = Journal(level, **journal_args)
+    store = TileStore(on_change=journal.record)
+    store.load([(rng.randint(0, 5), x, 14, 1.0) for x in range(16)])
+    journal.reset(store.tiles())
+    return store, journal
+
+
+def test_recover_after_torn_line(tmp_path):
+    level = tmp_path / "level.json"
+    rng = random.Random(1)
+    store, journal = open_store(level, rng, autosave_edits=7)
+    random_edits(store, rng, 300)
+    journal.wait()
+    # the editor dies halfway through writing the next line
+    with open(editor_journal.journal_path(level), "a") as f:
+        f.write('[[[1,2,3,1.0]],[[99')
+    assert editor_journal.recover(level) == store.tiles()
+    journal.close()
+
+
+def test_replay_is_idempotent(tmp_path):
+    level = tmp_path / "level.json"
+    rng = random.Random(2)
+    store, journal = open_store(level, rng, autosave_edits=1000)
+    random_edits(store, rng, 100)
+    journal.wait()
+    lines = editor_journal.journal_path(level).read_text()
+    assert lines
+    # crash between writing the snapshot and emptying the journal: the
+    # snapshot already holds every line still left in the journal
+    journal.close()
+    editor_journal.journal_path(level).write_text(lines)
+    assert editor_journal.recover(level) == store.tiles()
+
+
+def test_recover_after_reopen(tmp_path):
+    level = tmp_path / "level.json"
+    rng = random.Random(3)
+    store, journal = open_store(level, rng, autosave_edits=5)
+    random_edits(store, rng, 50)
+    journal.close()
+
+    # the next session starts from the recovered tiles and keeps editing
+    recovered = editor_journal.recover(level)
+    assert recovered == store.tiles()
+    store = TileStore()
+    store.load(recovered)
+    journal = Journal(level, autosave_edits=5)
+    store.on_change = journal.record
+    journal.reset(store.tiles(), saved=False)
+    random_edits(store, rng, 50)
+    journal.wait()
+    assert editor_journal.recover(level) == store.tiles()
+    journal.close()
+
+
+def test_save_round_trips(tmp_path):
+    level = tmp_path / "level.json"
+    rng = random.Random(4)
+    store, journal = open_store(level, rng, autosave_edits=7)
+    random_edits(store, rng, 200)
+    journal.save()
+    journal.wait()
+    with open(level) as f:
+        saved = json.load(f)
+    assert saved == store.to_entries()
+    assert list(level_format.iter_records(saved)) == store.tiles()
+    assert not editor_journal.journal_path(level).exists()
+    assert not editor_journal.autosave_path(level).exists()
+    assert editor_journal.recover(level) is None
+
+    # editing after a save starts a new snapshot from the saved tiles
+    store.place(9, 0, 0)
+    random_edits(store, rng, 20)
+    journal.wait()
+    assert editor_journal.recover(level) == store.tiles()
+    journal.close()
+
+
+def test_reset_saved_discards_recovery_files(tmp_path):
+    level = tmp_path / "level.json"
+    rng = random.Random(5)
+    store, journal = open_store(level, rng)
+    random_edits(store, rng, 20)
+    journal.wait()
+    assert editor_journal.autosave_path(level).exists()
+    store.load(store.tiles())
+    journal.reset(store.tiles())
+    journal.wait()
+    assert editor_journal.recover(level) is None
+    journal.close()
+
+
+def test_recover_keeps_levels_of_demo(tmp_path):
+    level = tmp_path / "Demo.json"
+    shutil.copy(LEVELS / "Demo.json", level)
+    journal = Journal(level)
+    store = TileStore(on_change=journal.record)
+    with open(level) as f:
+        store.load(json.load(f))
+    journal.reset(store.tiles(), saved=False)
+    store.erase_rect(0, 0, 40, 20)
+    store.undo()
+    store.fill_rect(5, 5, 9, 9, 3, 2.0)
+    journal.wait()
+    assert editor_journal.recover(level) == store.tiles()
+    journal.close()
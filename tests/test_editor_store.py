@@ -0,0 +1,219 @@
+# This file checks the editor's TileStore without pygame
+
+import json
+import random
+from pathlib import Path
+
+from editor_store import TileStore
+
+LEVELS = Path(__file__).resolve().parent.parent / "src" / "levels"
+
+
+def random_edit(store, rng):
+    x, y = rng.randint(0, 11), rng.randint(0, 7)
+    t, s = rng.randint(0, 4), rng.choice((1.0, 2.0))
+    op = rng.random()
+    if op < 0.5:
+        return store.place(t, x, y, s)
+    if op < 0.7:
+        return store.erase(x, y)
+    if op < 0.85:
+        return store.fill_rect(x, y, x + 2, y + 1, t, s)
+    return store.erase_rect(x, y, x + 3, y + 2)
+
+
+def check_index(store):
+    """cells must list exactly the placed tiles, bottom to top by order."""
+    cells = {}
+    for tile in store.tiles():
+        cells.setdefault((tile[1], tile[2]), []).append(tile)
+    assert store.cells == cells
+    assert store.next_order > max(store.order.values(), default=-1)
+
+
+# --- Layers ---
+def test_layers_are_kept():
+    store = TileStore()
+    store.place(1, 2, 3)
+    store.place(4, 2, 3, 2.0)
+    store.place(1, 2, 3)                # already there: no change, no command
+    assert store.get(2, 3) == [(1, 1.0), (4, 2.0)]
+    assert len(store) == 2
+    assert len(store.undo_stack) == 2
+    assert (2, 3) in store and (3, 2) not in store
+
+
+def test_load_merges_only_exact_duplicates():
+    store = TileStore()
+    read = store.load([(1, 0, 0, 1.0), (2, 0, 0, 1.0), (1, 0, 0, 1.0), (1, 0, 0, 2.0)])
+    assert read == 4
+    # the last copy of a duplicate is the one drawn on top
+    assert store.tiles() == [(2, 0, 0, 1.0), (1, 0, 0, 1.0), (1, 0, 0, 2.0)]
+    assert store.get(0, 0) == [(2, 1.0), (1, 1.0), (1, 2.0)]
+    assert sorted(store.order.values()) == [0, 1, 2]
+
+
+def test_demo_round_trips():
+    with open(LEVELS / "Demo.json") as f:
+        entries = json.load(f)
+    store = TileStore()
+    assert store.load(entries) == len(entries)
+    check_index(store)
+    again = TileStore()
+    again.load(store.to_entries())
+    assert again.tiles() == store.tiles()
+
+
+# --- History ---
+def test_undo_redo_restore_every_step():
+    rng = random.Random(1)
+    store = TileStore()
+    store.load([(0, x, 7, 1.0) for x in range(12)])
+    history = [store.tiles()]
+    for _ in range(300):
+        if random_edit(store, rng):
+            history.append(store.tiles())
+            check_index(store)
+    assert len(store.undo_stack) == len(history) - 1
+
+    for tiles in reversed(history[:-1]):
+        assert store.undo()
+        assert store.tiles() == tiles
+        check_index(store)
+    assert not store.undo()
+    for tiles in history[1:]:
+        assert store.redo()
+        assert store.tiles() == tiles
+    assert not store.redo()
+
+
+def test_undo_restores_depth():
+    store = TileStore()
+    store.place(1, 0, 0)
+    store.place(2, 0, 0)
+    store.place(3, 0, 0)
+    store.edit(removed=[(2, 0, 0, 1.0)])
+    store.undo()
+    assert store.get(0, 0) == [(1, 1.0), (2, 1.0), (3, 1.0)]
+
+
+def test_edit_clears_redo():
+    store = TileStore()
+    store.place(1, 0, 0)
+    store.undo()
+    store.place(2, 0, 0)
+    assert not store.redo()
+    assert store.tiles() == [(2, 0, 0, 1.0)]
+
+
+def test_on_change_mirror():
+    """A mirror fed only by on_change ends up equal to the store, as the canvas and journal do."""
+    mirror = {}
+
+    def on_change(removed, added):
+        for tile in removed:
+            del mirror[tile]
+        for order, tile in added:
+            assert tile not in mirror
+            mirror[tile] = order
+
+    rng = random.Random(2)
+    store = TileStore(on_change=on_change)
+    for _ in range(300):
+        if rng.random() < 0.7:
+            random_edit(store, rng)
+        elif rng.random() < 0.5:
+            store.undo()
+        else:
+            store.redo()
+        assert mirror == store.order
+
+
+# --- Regions ---
+def test_fill_and_erase_rect():
+    store = TileStore()
+    store.place(9, 1, 1)
+    assert store.fill_rect(3, 2, 0, 0, 5) == 12       # corners in any order
+    assert store.fill_rect(0, 0, 3, 2, 5) == 0        # already filled
+    assert store.get(1, 1) == [(9, 1.0), (5, 1.0)]
+    assert len(store.undo_stack) == 2
+
+    assert store.erase_rect(1, 1, 2, 2) == 5          # both layers of (1, 1)
+    assert all((x, y) not in store for x in (1, 2) for y in (1, 2))
+    assert len(store) == 8
+    store.undo()
+    assert len(store) == 13
+    store.undo()                                       # one undo reverts the whole fill
+    assert store.tiles() == [(9, 1, 1, 1.0)]
+
+
+def test_flood_fill():
+    store = TileStore()
+    # a wall at x == 3 splits the empty area
+    store.fill_rect(3, 0, 3, 4, 1)
+    store.place(2, 0, 0)
+    bounds = (0, 0, 5, 4)
+    assert store.flood_fill(1, 1, 7, 1.0, bounds) == 3 * 5 - 1
+    assert store.get(0, 0) == [(2, 1.0)]               # different layers stop the fill
+    assert all(store.get(3, y) == [(1, 1.0)] for y in range(5))
+    assert (4, 0) not in store and (6, 0) not in store
+    assert store.flood_fill(1, 1, 7, 1.0, bounds) == 0  # already that tile
+    assert store.flood_fill(9, 9, 7, 1.0, bounds) == 0  # outside the bounds
+
+    # filling a layered area matches the exact layer stack
+    assert store.flood_fill(3, 2, 8, 1.0, bounds) == 5
+    assert store.get(3, 0) == [(1, 1.0), (8, 1.0)]
+    store.undo()
+    store.undo()
+    assert store.flood_fill(4, 4, 7, 1.0, bounds) == 2 * 5  # stops at the bounds
+    assert (6, 4) not in store
+
+
+def test_copy_paste():
+    store = TileStore()
+    store.place(1, 5, 5)
+    store.place(2, 6, 5, 2.0)
+    store.place(3, 5, 5)
+    store.place(4, 9, 9)
+    clip = store.copy_rect(6, 6, 5, 5)
+    assert clip == [(0, 0, 1, 1.0), (1, 0, 2, 2.0), (0, 0, 3, 1.0)]
+
+    assert store.paste(clip, 0, 0, (0, 0, 20, 20)) == 3
+    assert store.get(0, 0) == [(1, 1.0), (3, 1.0)]
+    assert store.get(1, 0) == [(2, 2.0)]
+    assert (0, 1) not in store                          # empty clip cells are left alone
+    assert store.paste(clip, 0, 0, (0, 0, 20, 20)) == 0
+
+    # tiles landing outside the bounds are dropped
+    assert store.paste(clip, 20, 3, (0, 0, 20, 20)) == 2
+    assert (21, 3) not in store
+    assert store.paste(clip, -1, 0, (0, 0, 20, 20)) == 1
+    assert store.get(0, 0) == [(1, 1.0), (3, 1.0), (2, 2.0)]
+    assert all(0 <= x <= 20 and 0 <= y <= 20 for _, x, y, _ in store.tiles())
+
+
+def test_region_ops_undo_redo():
+    rng = random.Random(3)
+    store = TileStore()
+    store.load([(0, x, 7, 1.0) for x in range(12)])
+    bounds = (0, 0, 11, 7)
+    history = [store.tiles()]
+    for _ in range(200):
+        x, y = rng.randint(0, 11), rng.randint(0, 7)
+        op = rng.random()
+        if op < 0.3:
+            changed = store.flood_fill(x, y, rng.randint(0, 3), 1.0, bounds)
+        elif op < 0.6:
+            clip = store.copy_rect(x, y, x + rng.randint(0, 4), y + rng.randint(0, 3))
+            changed = store.paste(clip, rng.randint(0, 11), rng.randint(0, 7), bounds)
+        else:
+            changed = random_edit(store, rng)
+        if changed:
+            history.append(store.tiles())
+    for tiles in reversed(history[:-1]):
+        store.undo()
+        assert store.tiles() == tiles
+        check_index(store)
+    for tiles in history[1:]:
+        store.redo()
+        assert store.tiles() == tiles
@@ -0,0 +1,176 @@
+# This file checks that every way of loading a level gives the same tiles
+
+import json
+import struct
+from pathlib import Path
+
+import pytest
+
+import level_format
+from level_format import LevelSections, SCALE_UNIT, pixel_size, quantize_scale
+
+LEVELS = Path(__file__).resolve().parent.parent / "src" / "levels"
+SOURCES = ["Demo.json", "level1.json", "level_data.csv"]
+
+
+def records(name):
+    return level_format.from_entries(level_format.load(LEVELS / name))
+
+
+def quantized(recs):
+    return [(t, x, y, quantize_scale(s) / SCALE_UNIT) for t, x, y, s in recs]
+
+
+def as_version_2(data):
+    """A version 3 file with its extent dropped, as older converters wrote it."""
+    header = level_format.HEADER
+    out = bytearray(data[:header.size])
+    struct.pack_into("<H", out, 4, 2)
+    at = header.size + level_format.SECTION_HEADER.size
+    return bytes(out) + data[header.size:at] + data[at + level_format.EXTENT.size:]
+
+
+def sections_of(level):
+    return {key: level.records(key) for key in level.keys()}
+
+
+# --- .rrl pack / read ---
+@pytest.mark.parametrize("name", SOURCES)
+def test_read_binary_round_trip(tmp_path, name):
+    recs = records(name)
+    path = tmp_path / "level.rrl"
+    level_format.write_binary(path, recs)
+    data = level_format.read_binary(path)
+    assert len(data) == len(recs)
+    assert list(data) == quantized(recs)
+    # quantizing never changes what is drawn
+    assert [pixel_size(s) for *_, s in data] == [pixel_size(s) for *_, s in recs]
+    assert data.bounds == LevelSections.from_records(recs).bounds
+
+
+@pytest.mark.parametrize("name", SOURCES)
+@pytest.mark.parametrize("version", [2, 3])
+def test_read_sections_match_memory(tmp_path, name, version):
+    recs = records(name)
+    data = level_format.pack(recs)
+    path = tmp_path / "level.rrl"
+    path.write_bytes(data if version == 3 else as_version_2(data))
+    memory = LevelSections.from_records(recs)
+    mapped = level_format.read_sections(path)
+    try:
+        assert mapped.bounds == memory.bounds
+        assert mapped.max_cells == memory.max_cells
+        assert mapped.key_range() == memory.key_range()
+        assert sections_of(mapped) == {key: [(o, t, x, y, quantize_scale(s) / SCALE_UNIT)
+                                             for o, t, x, y, s in section]
+                                       for key, section in sections_of(memory).items()}
+        if version == 3:
+            assert mapped.extent == memory.extent
+            assert mapped.index_range == memory.index_range
+        high = memory.index_range[1]
+        for tile_count in (None, high + 1, high, 1):
+            assert mapped.pixel_extent(tile_count) == memory.pixel_extent(tile_count)
+    finally:
+        mapped.close()
+
+
+def test_pixel_extent_skips_missing_tiles():
+    level = LevelSections.from_records([(0, 0, 0, 1.0), (5, 10, 0, 2.0), (-1, 20, 0, 1.0)])
+    size = level_format.TILE_SIZE
+    assert level.pixel_extent() == (0, 0, 10 * size + 2 * size, 2 * size)
+    assert level.pixel_extent(5) == (0, 0, size, size)
+    assert level.pixel_extent(0) == (0, 0, 0, 0)
+
+
+def test_empty_level(tmp_path):
+    path = tmp_path / "empty.rrl"
+    level_format.write_binary(path, [])
+    assert list(level_format.read_binary(path)) == []
+    level = level_format.read_sections(path)
+    assert level.keys() == []
+    assert level.pixel_extent() == (0, 0, 0, 0)
+    level.close()
+
+
+def test_pack_rejects_out_of_range():
+    with pytest.raises(ValueError):
+        level_format.pack([(1, 40000, 0, 1.0)])
+    with pytest.raises(ValueError):
+        level_format.pack([(1, 0.5, 0, 1.0)])
+
+
+def test_read_rejects_truncated(tmp_path):
+    path = tmp_path / "level.rrl"
+    path.write_bytes(level_format.pack(records("Demo.json"))[:-1])
+    with pytest.raises(ValueError):
+        level_format.read_binary(path)
+
+
+def test_convert_round_trip(tmp_path):
+    level_format.convert(LEVELS / "Demo.json", tmp_path / "Demo.rrl")
+    level_format.convert(tmp_path / "Demo.rrl", tmp_path / "Demo.json")
+    back = level_format.from_entries(level_format.load(tmp_path / "Demo.json"))
+    assert back == quantized(records("Demo.json"))
+
+
+# --- Incremental loading ---
+def steps_of(gen):
+    steps = []
+    while True:
+        try:
+            steps.append(next(gen))
+        except StopIteration as done:
+            return steps, done.value
+
+
+@pytest.mark.parametrize("name", ["Demo.json", "level1.json"])
+def test_iter_load_matches_json_load(name):
+    path = LEVELS / name
+    with open(path) as f:
+        expected = json.load(f)
+    steps, data = steps_of(level_format.iter_load(path, batch=100))
+    assert data == expected
+    assert len(steps) == (len(expected) - 1) // 100
+    done = [d for _, d, _ in steps]
+    assert done == sorted(done) and all(total == len(path.read_text()) for *_, total in steps)
+
+
+@pytest.mark.parametrize("text", [
+    "[]", " [ ] \n", "[1, [2, 3], {\"a\": [4]}]\n", "\n[\n1\n,\n2\n]\n", "{\"tiles\": []}", "7",
+])
+def test_iter_load_valid(tmp_path, text):
+    path = tmp_path / "level.json"
+    path.write_text(text)
+    assert level_format.run_steps(level_format.iter_load(path, batch=1)) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", [
+    "[1, 2] junk", "[1, 2]]", "[1,]", "[1, 2,\n]", "[1 2]", "[1, 2", "[", "[,]", "",
+])
+def test_iter_load_rejects_what_json_rejects(tmp_path, text):
+    path = tmp_path / "level.json"
+    path.write_text(text)
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+    with pytest.raises(json.JSONDecodeError):
+        level_format.run_steps(level_format.iter_load(path, batch=1))
+
+
+@pytest.mark.parametrize("name", SOURCES + ["Demo.rrl"])
+def test_iter_open_sections_matches_open_sections(tmp_path, name):
+    if name.endswith(".rrl"):
+        path = tmp_path / name
+        level_format.convert(LEVELS / "Demo.json", path)
+    else:
+        path = LEVELS / name
+    expected = level_format.open_sections(path)
+    level = level_format.run_steps(level_format.iter_open_sections(path, batch=100))
+    try:
+        assert level.bounds == expected.bounds
+        assert level.max_cells == expected.max_cells
+        assert level.extent == expected.extent
+        assert level.index_range == expected.index_range
+        assert sections_of(level) == sections_of(expected)
+    finally:
+        level.close()
+        expected.close()